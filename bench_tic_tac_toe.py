@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark the tic tac toe engines from every reachable position
+
+    python bench_tic_tac_toe.py                                   # every engine, every position with a move to make
+    python bench_tic_tac_toe.py --side o --engines minimax_cold table --output before.json
+    python bench_tic_tac_toe.py --output after.json --compare before.json
+
+each engine is asked for the best move of every reachable, unfinished position (one call per position)
+and each call is timed on its own, giving p50 / p99 move latency; search engines also report their
+SearchStats (nodes, terminal checks, cache hits, max depth) and nodes per second
+every move is checked against the solver, so a fast but wrong engine shows up as such
+the whole run is dumped as JSON, to compare two versions of the code engine by engine
+
+engines
+    minimax_cold          TicTacToeEngine.best_move, transposition table cleared before every position
+    minimax_warm          TicTacToeEngine.best_move, transposition table kept across positions
+    iterative_deepening   MNKEngine on 3x3, no time limit
+    table                 TicTacToeEngine.table_move, only if the perfect play table is built
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List
+import argparse
+import json
+import platform
+import sys
+import time
+
+from tic_tac_toe import TicTacToeEngine,SearchStats,PlayTable
+from tic_tac_toe_mnk import MNKEngine
+from tic_tac_toe_solver import solve,board_from_index
+
+########################################################
+# engines under test
+########################################################
+def minimax_cold(engine : TicTacToeEngine, marker : str) -> int:
+    TicTacToeEngine.transpositions.clear()
+    return engine.best_move(marker)
+
+def minimax_warm(engine : TicTacToeEngine, marker : str) -> int:
+    return engine.best_move(marker)
+
+def table(engine : TicTacToeEngine, marker : str) -> int:
+    return engine.table_move(marker)
+
+# name -> (engine factory taking a SearchStats, move function)
+ENGINES : Dict = {
+    'minimax_cold'        : (TicTacToeEngine, minimax_cold),
+    'minimax_warm'        : (TicTacToeEngine, minimax_warm),
+    'iterative_deepening' : (lambda stats: MNKEngine(3, 3, 3, float('inf'), stats=stats), minimax_warm),
+}
+if TicTacToeEngine.load_table() is not None:
+    ENGINES['table'] = (TicTacToeEngine, table)
+
+########################################################
+# measuring
+########################################################
+def positions(side : str = None) -> tuple:
+    '''
+    (solver results, sorted base-3 indexes of every reachable unfinished position, of `side` to move if given)
+    '''
+    solved = solve()
+    out = []
+    for index,(loc,_) in solved.items():
+        if not loc:
+            continue # game over
+        played = board_from_index(index).count()
+        marker = TicTacToeEngine.human_marker if played % 2 == 0 else TicTacToeEngine.cpu_marker
+        if side is None or marker == side:
+            out.append(index)
+    return solved, sorted(out)
+
+def percentile(samples : List, q : float) -> float:
+    '''
+    q-th percentile of sorted samples, nearest rank
+    '''
+    return samples[min(len(samples) - 1, int(q / 100 * len(samples)))] if samples else float('nan')
+
+def run_engine(name : str, solved : Dict, indexes : List) -> Dict:
+    '''
+    time one engine on every position, returns a JSON-able dict
+    '''
+    make_engine, move = ENGINES[name]
+    stats = SearchStats()
+    engine = make_engine(stats)
+    TicTacToeEngine.transpositions.clear() # every engine starts cold
+
+    latencies, optimal = [], 0
+    for index in indexes:
+        engine.reset()
+        engine.board.bits.update(board_from_index(index).bits)
+        marker = engine.to_move()
+
+        t0 = time.perf_counter()
+        loc = move(engine, marker)
+        latencies.append(time.perf_counter() - t0)
+
+        engine.board.move(loc, marker)
+        optimal += solved[PlayTable.index(engine.board)][1] == solved[index][1]
+
+    latencies.sort()
+    seconds = sum(latencies)
+    return {
+        'engine'           : name,
+        'positions'        : len(indexes),
+        'seconds'          : seconds,
+        'mean_us'          : seconds / len(indexes) * 1e6,
+        'p50_us'           : percentile(latencies, 50) * 1e6,
+        'p99_us'           : percentile(latencies, 99) * 1e6,
+        'max_us'           : latencies[-1] * 1e6,
+        'optimal_moves'    : optimal / len(indexes),
+        'nodes'            : stats.nodes,
+        'nodes_per_second' : stats.nodes / seconds if seconds else 0.0,
+        'terminal_checks'  : stats.terminal_checks,
+        'cache_hits'       : stats.cache_hits,
+        'max_depth'        : stats.max_depth,
+    }
+
+def compare(current : List, baseline : List) -> List:
+    '''
+    (case, p50 now / p50 before) for every engine present in both runs
+    '''
+    before = {case['engine']:case for case in baseline}
+    return [
+        (case, case['p50_us'] / before[case['engine']]['p50_us'])
+        for case in current
+        if case['engine'] in before and before[case['engine']]['p50_us'] > 0
+    ]
+
+########################################################
+# main
+########################################################
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark the tic tac toe engines')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=list(ENGINES))
+    parser.add_argument('--side', choices=[TicTacToeEngine.human_marker, TicTacToeEngine.cpu_marker], help='only positions with this side to move')
+    parser.add_argument('--output', default='bench_tic_tac_toe.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args(argv)
+
+    solved, indexes = positions(args.side)
+    cases = []
+    for name in args.engines:
+        case = run_engine(name, solved, indexes)
+        cases.append(case)
+        print(
+            f"{name:20} {case['positions']:>5} positions  p50 {case['p50_us']:8.1f}us  p99 {case['p99_us']:8.1f}us"
+            f"  {case['nodes_per_second']:>10,.0f} nodes/s  optimal {case['optimal_moves']:.1%}",
+            flush=True,
+        )
+
+    results = {
+        'python'    : sys.version.split()[0],
+        'platform'  : platform.platform(),
+        'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases'     : cases,
+    }
+    with open(args.output,'w') as f:
+        json.dump(results, f, indent=1)
+    print('results written to', args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['cases']
+        print()
+        print('ratio = p50 now / p50 before, > 1 is a slowdown')
+        for case,ratio in compare(cases, baseline):
+            print(f"{case['engine']:20} {ratio:6.2f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark the top sorts across graph shapes and sizes
+
+    python bench_topsort.py                                  # all shapes, 1e3 .. 1e6 nodes, kahn / onion / csr
+    python bench_topsort.py --sizes 1000 10000 --shapes chain layered --output before.json
+    python bench_topsort.py --sizes 1000 10000 --output after.json --compare before.json
+
+each case records wall time (best of --repeat), peak traced memory (tracemalloc, separate run)
+and the number of dependencies_fn calls, and the whole run is dumped as JSON
+so two versions of the code can be compared case by case
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import topsort_kahn
+import topsort_onion
+
+try:
+    import topsort_csr # needs numpy
+except ImportError:
+    topsort_csr = None
+
+########################################################
+# synthetic DAGs
+########################################################
+def chain(n : int, rng : random.Random) -> Dict:
+    '''
+    0 <- 1 <- 2 <- ... one long dependency chain, n layers of width 1
+    '''
+    return {i:[i-1] if i else [] for i in range(n)}
+
+def fan_in(n : int, rng : random.Random) -> Dict:
+    '''
+    n-1 leaves and one node depending on all of them
+    '''
+    graph = {i:[] for i in range(n-1)}
+    graph[n-1] = list(range(n-1))
+    return graph
+
+def fan_out(n : int, rng : random.Random) -> Dict:
+    '''
+    one root and n-1 nodes depending on it
+    '''
+    return {i:[0] if i else [] for i in range(n)}
+
+def random_sparse(n : int, rng : random.Random, degree : int = 2) -> Dict:
+    '''
+    each node depends on up to `degree` random earlier nodes
+    '''
+    return {i:rng.sample(range(i),min(i,degree)) for i in range(n)}
+
+def random_dense(n : int, rng : random.Random) -> Dict:
+    '''
+    each node depends on up to 16 random earlier nodes
+    '''
+    return random_sparse(n, rng, degree=16)
+
+def layered(n : int, rng : random.Random, degree : int = 3) -> Dict:
+    '''
+    ~sqrt(n) layers of ~sqrt(n) nodes, each depending on `degree` random nodes of the previous layer
+    '''
+    width = max(1,int(n ** 0.5))
+    graph = {}
+    for i in range(n):
+        start = (i // width - 1) * width # first node of the previous layer
+        graph[i] = rng.sample(range(start,start + width),min(degree,width)) if start >= 0 else []
+    return graph
+
+SHAPES : Dict = {
+    'chain'         : chain,
+    'fan_in'        : fan_in,
+    'fan_out'       : fan_out,
+    'random_sparse' : random_sparse,
+    'random_dense'  : random_dense,
+    'layered'       : layered,
+}
+
+########################################################
+# algorithms under test
+########################################################
+ALGORITHMS : Dict = {
+    'kahn'  : topsort_kahn.top_sort,
+    'onion' : topsort_onion.top_sort,
+}
+if topsort_csr is not None:
+    ALGORITHMS['csr'] = topsort_csr.top_sort
+
+########################################################
+# measuring
+########################################################
+class CountingDependencies:
+    '''
+    dependencies_fn wrapper counting how often the sort calls it
+    '''
+
+    def __init__(self, graph : Dict):
+        self.graph = graph
+        self.calls = 0
+
+    def __call__(self, node) -> List:
+        self.calls += 1
+        return self.graph[node]
+
+def run_case(algorithm : str, shape : str, n : int, repeat : int = 1, memory : bool = True, seed : int = 0) -> Dict:
+    '''
+    time one algorithm on one generated graph, returns a JSON-able dict
+    '''
+    graph = SHAPES[shape](n, random.Random(seed))
+    sort = ALGORITHMS[algorithm]
+
+    best = float('inf')
+    for _ in range(repeat):
+        deps = CountingDependencies(graph)
+        t0 = time.perf_counter()
+        order = sort(graph, deps)
+        best = min(best, time.perf_counter() - t0)
+    assert len(order) == n
+
+    peak = None
+    if memory:
+        # separate run, tracemalloc slows everything down
+        tracemalloc.start()
+        sort(graph, graph.__getitem__)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'algorithm'      : algorithm,
+        'shape'          : shape,
+        'nodes'          : n,
+        'edges'          : sum(map(len,graph.values())),
+        'seconds'        : best,
+        'peak_bytes'     : peak,
+        'callback_calls' : deps.calls,
+    }
+
+def case_key(case : Dict) -> tuple:
+    return case['algorithm'], case['shape'], case['nodes']
+
+def compare(current : List, baseline : List) -> List:
+    '''
+    (case, seconds now / seconds before) for every case present in both runs
+    '''
+    before = {case_key(case):case for case in baseline}
+    return [
+        (case, case['seconds'] / before[case_key(case)]['seconds'])
+        for case in current
+        if case_key(case) in before and before[case_key(case)]['seconds'] > 0
+    ]
+
+########################################################
+# main
+########################################################
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark topsort_kahn / topsort_onion / topsort_csr')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000,10000,100000,1000000])
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), default=list(SHAPES))
+    parser.add_argument('--algorithms', nargs='+', choices=sorted(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--repeat', type=int, default=1, help='timed runs per case, the best one is kept')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_topsort.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against')
+    args = parser.parse_args(argv)
+
+    cases = []
+    for n in args.sizes:
+        for shape in args.shapes:
+            for algorithm in args.algorithms:
+                case = run_case(algorithm, shape, n, args.repeat, not args.no_memory, args.seed)
+                cases.append(case)
+                peak = '' if case['peak_bytes'] is None else f"{case['peak_bytes'] / 1024**2:9.1f}MB"
+                print(f"{algorithm:6} {shape:14} N={n:>8} E={case['edges']:>9} {case['seconds']:9.4f}s {peak}", flush=True)
+
+    results = {
+        'python'    : sys.version.split()[0],
+        'platform'  : platform.platform(),
+        'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases'     : cases,
+    }
+    with open(args.output,'w') as f:
+        json.dump(results, f, indent=1)
+    print('results written to', args.output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['cases']
+        print()
+        print('ratio = seconds now / seconds before, > 1 is a slowdown')
+        for case,ratio in compare(cases, baseline):
+            print(f"{case['algorithm']:6} {case['shape']:14} N={case['nodes']:>8} {ratio:6.2f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
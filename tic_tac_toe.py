@@ -9,24 +9,710 @@ Created on Fri Jun 10 21:48:46 2022
 # imports
 ########################################################
 from typing import Dict
+from collections import OrderedDict # LRU transposition table
 import time # make cpu seem thoughtful
 import random # make cpu seem thoughtful
 from itertools import cycle # to zip lists of different lengths
+import copy
+import math # MoveStats histogram buckets
+import mmap # perfect play table
+import os
+import struct
+import zlib
 
 ########################################################
-# TicTacToe class
+# bitboard tables
 ########################################################
-class TicTacToe:
-    
+# all triplets that win
+LINES = (
+    (1,2,3),(4,5,6),(7,8,9), # rows
+    (1,4,7),(2,5,8),(3,6,9), # cols
+    (1,5,9),(7,5,3),         # diags
+)
+WIN_MASKS = tuple(sum(1 << (loc-1) for loc in line) for line in LINES)
+
+# lookup tables over all 512 bit patterns of one player
+WINNING  = tuple(any(bits & mask == mask for mask in WIN_MASKS) for bits in range(512))
+POPCOUNT = tuple(bin(bits).count('1') for bits in range(512))
+
+# per location, the other two locations of each line through it, as masks
+PAIRS = {
+    loc:tuple(mask & ~(1 << (loc-1)) for mask in WIN_MASKS if mask >> (loc-1) & 1)
+    for loc in range(1,10)
+}
+
+########################################################
+# BitBoard class
+########################################################
+class BitBoard:
+    '''
+    board as one 9-bit int per player, bit loc-1 is set when the player holds location loc
+
+    moves, undos, win / full checks are integer operations on those bits
+    it also reads and writes like the old dict {1..9 : marker}, so show_board, play_location and human_turn still work
+
+    usage:
+        board = BitBoard('x','o',' ')
+        board.move(5,'x')    # same as board[5] = 'x'
+        board.is_win('x')    # False
+        board.undo(5,'x')    # same as board[5] = ' '
+    '''
+
+    size      = 9 # locations, named 1..size
+    lines     = LINES
+    FULL      = 0b111111111 # every location taken
+    WIN_MASKS = WIN_MASKS
+    WINNING   = WINNING
+    POPCOUNT  = POPCOUNT
+    PAIRS     = PAIRS
+
+    def __init__(self, first_marker : str = 'x', second_marker : str = 'o', empty_marker : str = ' '):
+        self.empty_marker = empty_marker
+        self.bits = {first_marker:0, second_marker:0} # marker -> 9-bit int
+
+    @classmethod
+    def from_dict(cls, board : Dict, first_marker : str = 'x', second_marker : str = 'o', empty_marker : str = ' '):
+        '''
+        build a BitBoard from an old style dict board
+        '''
+        out = cls(first_marker, second_marker, empty_marker)
+        for loc,marker in board.items():
+            out[loc] = marker
+        return out
+
+    # integer operations
+    def move(self, loc : int, marker : str) -> None:
+        self.bits[marker] |= 1 << (loc-1)
+
+    def undo(self, loc : int, marker : str) -> None:
+        self.bits[marker] &= ~(1 << (loc-1))
+
+    def occupied(self) -> int:
+        '''
+        mask of taken locations
+        '''
+        first, second = self.bits.values()
+        return first | second
+
+    def legal_moves_mask(self) -> int:
+        '''
+        mask of empty locations
+        '''
+        return self.FULL & ~self.occupied()
+
+    def is_full(self) -> bool:
+        return self.occupied() == self.FULL
+
+    def is_win(self, marker : str) -> bool:
+        return BitBoard.WINNING[self.bits[marker]]
+
+    def count(self) -> int:
+        '''
+        # markers on the board
+        '''
+        return BitBoard.POPCOUNT[self.occupied()]
+
+    def completes_line(self, loc : int, marker : str) -> bool:
+        '''
+        True if marker holds both other locations of some line through loc
+        '''
+        bits = self.bits[marker]
+        return any(bits & pair == pair for pair in BitBoard.PAIRS[loc])
+
+    # dict adapter
+    def _bit(self, loc : int) -> int:
+        if not (isinstance(loc,int) and 0 < loc <= self.size):
+            raise KeyError(loc)
+        return 1 << (loc-1)
+
+    def __getitem__(self, loc : int) -> str:
+        bit = self._bit(loc)
+        for marker,bits in self.bits.items():
+            if bits & bit:
+                return marker
+        return self.empty_marker
+
+    def __setitem__(self, loc : int, marker : str) -> None:
+        bit = self._bit(loc)
+        if marker != self.empty_marker and marker not in self.bits:
+            raise ValueError(f'unknown marker {marker!r}')
+        for m in self.bits:
+            self.bits[m] &= ~bit
+        if marker != self.empty_marker:
+            self.bits[marker] |= bit
+
+    def __contains__(self, loc) -> bool:
+        return isinstance(loc,int) and 0 < loc <= self.size
+
+    def __iter__(self):
+        return iter(range(1,self.size+1))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def keys(self):
+        return range(1,self.size+1)
+
+    def values(self) -> list:
+        return [self[loc] for loc in range(1,self.size+1)]
+
+    def items(self) -> list:
+        return [(loc,self[loc]) for loc in range(1,self.size+1)]
+
+    def copy(self) -> 'BitBoard':
+        out = copy.copy(self)
+        out.bits = dict(self.bits)
+        return out
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BitBoard):
+            return self.bits == other.bits
+        return dict(self.items()) == other
+
+    def __repr__(self) -> str:
+        return f'BitBoard({dict(self.items())!r})'
+
+########################################################
+# perfect play table
+########################################################
+TABLE_MAGIC   = b'TTT\x00'
+TABLE_VERSION = 1
+TABLE_HEADER  = struct.Struct('<4sHII') # magic, version, # entries, fingerprint
+TABLE_ENTRIES = 3**9 # one per base-3 board encoding
+TABLE_FINGERPRINT = zlib.crc32(repr((TABLE_VERSION, LINES)).encode()) # changes with the rules / format
+
+# base-3 value of one player's bits, location 1 is the least significant digit
+TERNARY = tuple(sum(3**i for i in range(9) if bits >> i & 1) for bits in range(512))
+
+class PlayTable:
+    '''
+    memory-mapped perfect play table, written offline by tic_tac_toe_solver.py, read by TicTacToeEngine.table_move
+
+    after the header there is one 2 byte entry per base-3 board encoding (first player = 1, second player = 2)
+        byte 0 : best location for the side to move, 0 if the board is terminal or unreachable
+        byte 1 : minimax score of the board as a signed byte, the second player (cpu) maximises
+
+    raises:
+        OSError if the file can't be read
+        ValueError if it is stale, i.e. written for another format version / set of rules, or truncated
+    '''
+
+    def __init__(self, path : str):
+        with open(path,'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = TABLE_HEADER.unpack_from(self.mm) if len(self.mm) >= TABLE_HEADER.size else None
+        if (
+            header != (TABLE_MAGIC, TABLE_VERSION, TABLE_ENTRIES, TABLE_FINGERPRINT) or
+            len(self.mm) != TABLE_HEADER.size + 2 * TABLE_ENTRIES
+        ):
+            self.mm.close()
+            raise ValueError(f'{path} is stale or not a play table, rebuild it with tic_tac_toe_solver.py')
+        self.entries = memoryview(self.mm)[TABLE_HEADER.size:].cast('b')
+
+    @staticmethod
+    def index(board : BitBoard) -> int:
+        '''
+        base-3 encoding of board
+        '''
+        first, second = board.bits.values()
+        return TERNARY[first] + 2 * TERNARY[second]
+
+    def lookup(self, board : BitBoard) -> tuple:
+        '''
+        (best location for the side to move, score) of board
+        '''
+        i = 2 * self.index(board)
+        return self.entries[i], self.entries[i+1]
+
+########################################################
+# search statistics
+########################################################
+class SearchStats:
+    '''
+    optional counters of the engine search, collected when engine.stats is a SearchStats
+    with engine.stats = None (the default) each hook costs a single `is not None` check
+
+    attributes:
+        nodes
+            positions visited (minimax / alphabeta calls)
+        terminal_checks, terminals
+            win / draw tests made, and how many found the game over
+        cache_hits
+            positions answered by the transposition table
+        max_depth
+            deepest position reached, in plies below the root
+        root_moves
+            list of {'move', 'score', 'seconds', 'nodes'} for each root move of the last best_move
+    the counters add up over searches until clear()
+    '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self.nodes           = 0
+        self.terminal_checks = 0
+        self.terminals       = 0
+        self.cache_hits      = 0
+        self.max_depth       = 0
+        self.root_moves      = []
+        self.root_played     = 0 # markers on the board at the root of the current search
+
+    def start(self, root_played : int) -> None:
+        '''
+        a best_move begins, from a root with root_played markers
+        '''
+        self.root_moves  = []
+        self.root_played = root_played
+
+    def node(self, played : int) -> None:
+        self.nodes += 1
+        if played - self.root_played > self.max_depth:
+            self.max_depth = played - self.root_played
+
+    def as_dict(self) -> Dict:
+        '''
+        counters as a plain dict, e.g. to log or dump as JSON
+        '''
+        return {
+            'nodes'           : self.nodes,
+            'terminal_checks' : self.terminal_checks,
+            'terminals'       : self.terminals,
+            'cache_hits'      : self.cache_hits,
+            'max_depth'       : self.max_depth,
+            'root_moves'      : list(self.root_moves),
+        }
+
+class MoveStats:
+    '''
+    latency and node counters of many moves (a tournament side, a server session), mergeable across processes
+
+    move times go in a log scale histogram (buckets 10% apart from 100ns), so percentiles
+    of millions of moves cost a few hundred ints, at the price of ~5% resolution
+    '''
+    base  = 1e-7 # seconds, lower edge of bucket 0
+    ratio = 1.1
+
+    def __init__(self):
+        self.moves   = 0
+        self.nodes   = 0
+        self.seconds = 0.0
+        self.buckets : Dict = {} # bucket index -> # moves
+
+    def record(self, seconds : float, nodes : int) -> None:
+        self.moves += 1
+        self.nodes += nodes
+        self.seconds += seconds
+        bucket = max(0, int(math.log(max(seconds, self.base) / self.base, self.ratio)))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other : 'MoveStats') -> None:
+        self.moves += other.moves
+        self.nodes += other.nodes
+        self.seconds += other.seconds
+        for bucket,count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def percentile(self, q : float) -> float:
+        '''
+        seconds below which q% of the moves took, upper edge of the bucket holding that move
+        '''
+        if not self.moves:
+            return float('nan')
+        rank = q / 100 * self.moves
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return self.base * self.ratio ** (bucket + 1)
+        return self.base * self.ratio ** (max(self.buckets) + 1)
+
+    def as_dict(self) -> Dict:
+        return {
+            'moves'   : self.moves,
+            'nodes'   : self.nodes,
+            'seconds' : self.seconds,
+            'buckets' : {str(bucket):count for bucket,count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d : Dict) -> 'MoveStats':
+        out = cls()
+        out.moves, out.nodes, out.seconds = d['moves'], d['nodes'], d['seconds']
+        out.buckets = {int(bucket):count for bucket,count in d['buckets'].items()}
+        return out
+
+########################################################
+# TicTacToeEngine class
+########################################################
+class TicTacToeEngine:
+    '''
+    the game without any I/O: board, legal moves, apply / undo and the cpu search
+    TicTacToe adds the console game on top
+
+    usage:
+        engine = TicTacToeEngine()
+        engine.apply(1)                     # human (x) moves first
+        engine.apply(engine.best_move())    # cpu (o) reply
+        engine.legal_moves()                # [2,3,4,6,7,8,9]
+        engine.undo()                       # take the cpu move back
+    '''
+
     # class variables
     human_marker = 'x'
     cpu_marker   = 'o'
     empty_marker = ' '
 
-    def __init__(self):
-        # nothing to init here
-        # I separate code into play_game() to make it easier to test
-        pass
+    # board shape, rows x cols locations numbered left to right, top to bottom, k in a row wins
+    rows, cols, k = 3, 3, 3
+
+    # all triplets that win
+    lines = BitBoard.lines
+
+    # try the center first, then corners, then edges, they are worth more in that order
+    move_preference = (5,1,3,7,9,2,4,6,8)
+
+    # the 8 rotations / reflections of the board, as the location each location maps to
+    symmetries = (
+        (1,2,3,4,5,6,7,8,9), # identity
+        (7,4,1,8,5,2,9,6,3), # rotate 90
+        (9,8,7,6,5,4,3,2,1), # rotate 180
+        (3,6,9,2,5,8,1,4,7), # rotate 270
+        (3,2,1,6,5,4,9,8,7), # mirror left-right
+        (7,8,9,4,5,6,1,2,3), # mirror top-bottom
+        (1,4,7,2,5,8,3,6,9), # mirror main diagonal
+        (9,6,3,8,5,2,7,4,1), # mirror anti diagonal
+    )
+    # symmetry -> 512 entry table mapping one player's bits to their image under that symmetry
+    symmetry_tables = tuple(
+        tuple(sum(1 << i for i,loc in enumerate(symmetry) if bits >> (loc-1) & 1) for bits in range(512))
+        for symmetry in symmetries
+    )
+
+    # transposition table shared by every game in the process
+    # (canonical board, is_maximising) -> (score, flag), least recently used first
+    transpositions       = OrderedDict()
+    transposition_limit  = 100000 # max entries kept, plenty as there are only 5478 legal boards
+    EXACT, LOWER, UPPER  = 0, 1, 2 # score is exact / a lower bound / an upper bound
+
+    # perfect play table, see tic_tac_toe_solver.py
+    table_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tic_tac_toe.table')
+    table      = None # PlayTable once loaded, False if missing or stale
+
+    def __init__(self, stats : SearchStats = None):
+        self.nodes_searched = 0 # minimax calls made by the last best_move
+        self.cache_hits     = 0 # of which answered by the transposition table
+        self.stats = stats # optional SearchStats
+        TicTacToeEngine.load_table() # memory-map the perfect play table once per process
+        self.reset()
+
+    @classmethod
+    def load_table(cls):
+        '''
+        the PlayTable at cls.table_path, None if it is missing or stale (the cpu then searches live)
+        '''
+        if cls.table is None:
+            try:
+                cls.table = PlayTable(cls.table_path)
+            except (OSError, ValueError):
+                cls.table = False
+        return cls.table or None
+
+    def create_board(self) -> BitBoard:
+        '''
+        represent board as one 9-bit int per player, it still reads / writes like a dico keyed 1-9
+        '''
+        return BitBoard(TicTacToeEngine.human_marker, TicTacToeEngine.cpu_marker, TicTacToeEngine.empty_marker)
+
+    def is_location_playable(self, loc : int) -> bool:
+        '''
+        utility function to check if location is on the board and free
+        '''
+        return loc in self.board and not self.board.occupied() >> (loc-1) & 1
+    
+    def reset(self) -> None:
+        '''
+        start a new game on an empty board
+        '''
+        self.board = self.create_board()
+        self.history = [] # locations played through apply, oldest first
+
+    def to_move(self) -> str:
+        '''
+        marker of the side to move, the human always moves first
+        '''
+        return TicTacToeEngine.human_marker if self.board.count() % 2 == 0 else TicTacToeEngine.cpu_marker
+
+    def legal_moves(self) -> list:
+        '''
+        empty locations, in increasing order
+        '''
+        free = self.board.legal_moves_mask()
+        return [loc for loc in range(1, self.board.size + 1) if free >> (loc-1) & 1]
+
+    def apply(self, loc : int) -> None:
+        '''
+        play loc for the side to move
+
+        raises:
+            ValueError if loc is off the board or taken, or the game is already over
+        '''
+        if not self.is_location_playable(loc) or self.is_over():
+            raise ValueError(f'illegal move {loc!r}')
+        self.board.move(loc, self.to_move())
+        self.history.append(loc)
+
+    def undo(self) -> int:
+        '''
+        take back the last move made with apply, returns its location
+
+        raises:
+            ValueError if there is nothing to take back
+        '''
+        if not self.history:
+            raise ValueError('no move to undo')
+        loc = self.history.pop()
+        self.board.undo(loc, self.board[loc])
+        return loc
+
+    def winner(self):
+        '''
+        marker of the winner, None if nobody has won (yet)
+        '''
+        if self.is_win_for_marker(TicTacToeEngine.human_marker):
+            return TicTacToeEngine.human_marker
+        if self.is_win_for_marker(TicTacToeEngine.cpu_marker):
+            return TicTacToeEngine.cpu_marker
+        return None
+
+    def is_over(self) -> bool:
+        return self.winner() is not None or self.no_more_moves()
+
+    def best_move(self, player_marker : str = None) -> int:
+        '''
+        minimax (with alpha-beta pruning) over every move of player_marker (the cpu by default), return the best location
+        the cpu plays the MAX scoring position, the human the MIN scoring one
+        self.nodes_searched holds the # positions visited to find it
+        '''
+        # initialize
+        player_marker = player_marker or TicTacToeEngine.cpu_marker
+        is_cpu = player_marker == TicTacToeEngine.cpu_marker
+        self.nodes_searched = 0
+        self.cache_hits     = 0
+        best_score = -10000 if is_cpu else 10000 # worst possible score for the player
+        best_move  = None # placeholder for best position found
+        stats = self.stats
+        if stats is not None:
+            stats.start(self.board.count())
+        
+        # iterate over playable locations, most promising first
+        for loc in self.ordered_moves(player_marker):
+            if stats is not None:
+                t0, nodes = time.perf_counter(), self.nodes_searched
+
+            # figure out minimax score of playing here position
+            self.board.move(loc, player_marker) # temporarily play it
+            if is_cpu:
+                score = self.minimax(self.board, False, best_score, 10000) # only need to know if it beats best_score
+            else:
+                score = self.minimax(self.board, True, -10000, best_score)
+            self.board.undo(loc, player_marker) # roll it back as we only want to play the best position which is not necessarily this one
+
+            if stats is not None:
+                stats.root_moves.append({
+                    'move'    : loc,
+                    'score'   : score, # a bound when alpha-beta cut it short
+                    'seconds' : time.perf_counter() - t0,
+                    'nodes'   : self.nodes_searched - nodes,
+                })
+            
+            # keep track of best playing position
+            if score > best_score if is_cpu else score < best_score:
+                best_score = score
+                best_move  = loc
+
+        return best_move
+
+    def table_move(self, player_marker : str = None):
+        '''
+        best move of player_marker (the cpu by default) read from the perfect play table, None if there is no usable entry
+        '''
+        table = TicTacToeEngine.load_table()
+        if table is None or self.to_move() != (player_marker or TicTacToeEngine.cpu_marker): # the table assumes the human moved first
+            return None
+        move, _ = table.lookup(self.board)
+        if move and self.is_location_playable(move):
+            return move
+        return None
+
+    def ordered_moves(self, player_marker : str) -> list:
+        '''
+        playable locations in the order worth searching them, good moves first makes alpha-beta prune more
+            (1) moves that win on the spot for player_marker
+            (2) moves that block an immediate win of the opponent
+            (3) the rest, center then corners then edges
+        '''
+        opponent_marker = TicTacToeEngine.human_marker if player_marker == TicTacToeEngine.cpu_marker else TicTacToeEngine.cpu_marker
+        free = self.board.legal_moves_mask()
+        wins, blocks, rest = [], [], []
+        for loc in TicTacToeEngine.move_preference:
+            if not free >> (loc-1) & 1:
+                continue
+            if self.board.completes_line(loc, player_marker):
+                wins.append(loc)
+            elif self.board.completes_line(loc, opponent_marker):
+                blocks.append(loc)
+            else:
+                rest.append(loc)
+        return wins + blocks + rest
+
+    def completes_line(self, loc : int, player_marker : str) -> bool:
+        '''
+        utility function to figure out if playing loc would win for player_marker
+        '''
+        return self.board.completes_line(loc, player_marker)
+
+    def position_key(self, is_maximising : bool) -> tuple:
+        '''
+        transposition table key, identical for all 8 rotations / reflections of the board
+        the board is read as human bits | cpu bits << 9 under each symmetry and the smallest one wins
+        '''
+        human = self.board.bits[TicTacToeEngine.human_marker]
+        cpu   = self.board.bits[TicTacToeEngine.cpu_marker]
+        canonical = min(table[human] | table[cpu] << 9 for table in TicTacToeEngine.symmetry_tables)
+        return canonical, is_maximising
+
+    def minimax(self, board, is_maximising : bool, alpha : float = -10000, beta : float = 10000):
+        '''
+        implement recursive minimax algo to compute score of playing this board to termination
+        - cpu plays against itself
+        - both (cpu) players are trying to maximize their score (a win) / minimize their score (a lose)
+        - faster wins score higher (10 - # markers on the board), slower losses score higher too
+
+        alpha-beta pruning:
+            alpha = score the maximiser is already guaranteed elsewhere
+            beta  = score the minimiser is already guaranteed elsewhere
+            once alpha >= beta the rest of this position's moves can't change the result, so skip them
+            the returned score is exact if it lands strictly between alpha and beta, a bound otherwise
+
+        transposition table:
+            scores are stored under the canonical board so transpositions / symmetric boards are searched once
+            exact scores are reused as is, bounds only when they settle the current alpha-beta window
+        '''
+        self.nodes_searched += 1
+        if self.stats is not None:
+            self.stats.node(self.board.count())
+
+        # seen this position (or a rotation / reflection of it) before?
+        table = TicTacToeEngine.transpositions
+        key = self.position_key(is_maximising)
+        entry = table.get(key)
+        if entry is not None:
+            table.move_to_end(key) # recently used
+            score, flag = entry
+            if (
+                flag == TicTacToeEngine.EXACT or
+                (flag == TicTacToeEngine.LOWER and score >= beta) or
+                (flag == TicTacToeEngine.UPPER and score <= alpha)
+            ):
+                self.cache_hits += 1
+                if self.stats is not None:
+                    self.stats.cache_hits += 1
+                return score
+        score = self.search(board, is_maximising, alpha, beta)
+
+        # remember the score, and whether alpha-beta cut it short
+        if score <= alpha:
+            flag = TicTacToeEngine.UPPER
+        elif score >= beta:
+            flag = TicTacToeEngine.LOWER
+        else:
+            flag = TicTacToeEngine.EXACT
+        table[key] = (score, flag)
+        table.move_to_end(key)
+        if len(table) > TicTacToeEngine.transposition_limit:
+            table.popitem(last=False) # evict least recently used
+        return score
+
+    def search(self, board, is_maximising : bool, alpha : float, beta : float):
+        '''
+        alpha-beta search of one position, see minimax
+        '''
+        # stopping conditions for recursion
+        if self.stats is not None:
+            self.stats.terminal_checks += 1
+            if self.is_win_for_marker(TicTacToeEngine.cpu_marker) or self.is_win_for_marker(TicTacToeEngine.human_marker) or self.no_more_moves():
+                self.stats.terminals += 1
+        if self.is_win_for_marker(TicTacToeEngine.cpu_marker):
+            return 10 - self.markers_played() # like games where we win, the sooner the better
+        elif self.is_win_for_marker(TicTacToeEngine.human_marker):
+            return self.markers_played() - 10 # don't like games where we lose, the later the better
+        elif self.no_more_moves():
+            return 0 # indifferent to games that are drawn
+
+        # both players        
+        if is_maximising:
+            # cpu wants to win
+            best_score = -1000
+            
+            for k in self.ordered_moves(TicTacToeEngine.cpu_marker):
+                # temporarily play move
+                self.board.move(k, TicTacToeEngine.cpu_marker)
+                score = self.minimax(board, False, alpha, beta)
+                
+                # roll it back
+                self.board.undo(k, TicTacToeEngine.cpu_marker)
+                if score > best_score: # "best score" needs to be maximal
+                    best_score = score
+                alpha = max(alpha, best_score)
+                if alpha >= beta:
+                    break # human won't allow this position, stop looking
+                        
+            return best_score
+        else:
+            # cpu human wants to avoid losing
+            best_score = 1000
+            
+            for k in self.ordered_moves(TicTacToeEngine.human_marker):
+                # temporarily play move
+                self.board.move(k, TicTacToeEngine.human_marker)
+                score = self.minimax(board, True, alpha, beta)
+                
+                # roll it back
+                self.board.undo(k, TicTacToeEngine.human_marker)
+                if score < best_score: # "best score" needs to be minimal
+                    best_score = score
+                beta = min(beta, best_score)
+                if alpha >= beta:
+                    break # cpu won't allow this position, stop looking
+    
+            return best_score
+        
+    def is_win_for_marker(self,player_marker : str):
+        '''
+        utility function to figure out if player with marker `player_marker` won
+        '''
+        return self.board.is_win(player_marker) # one table lookup on the player's 9 bits
+       
+    def markers_played(self) -> int:
+        '''
+        utility function to count occupied locations, i.e. the depth of the game so far
+        '''
+        return self.board.count()
+
+    def no_more_moves(self):
+        '''
+        utility function to figure out if board is full, used to help identify a draw condition
+        '''
+        return self.board.is_full()
+
+########################################################
+# TicTacToe class
+########################################################
+class TicTacToe(TicTacToeEngine):
+    '''
+    console game on top of the engine, all the typing, pauses and chit-chat live here
+    '''
 
     def type_text(self, msg : str, await_key_press = False) -> None:
         '''
@@ -54,7 +740,7 @@ class TicTacToe:
         play till end of game
         '''
         # init
-        self.board = self.create_board() # set the board
+        self.reset() # set the board
         
         # randomise what the cpu will say and in what order
         l = list(range(10))
@@ -99,12 +785,6 @@ class TicTacToe:
         elif self.no_more_moves():
             self.type_text('we drew, I\'m pretty sure that\'s the best you can do')
         
-    def create_board(self) -> Dict:
-        '''
-        represent board as integer keyed dico running with keys 1-9
-        '''
-        return dict(zip(range(1,10),cycle(TicTacToe.empty_marker)))
-
     def show_val(self,x,show_location : bool = False):
         '''
         utility function for self.show_board
@@ -117,21 +797,15 @@ class TicTacToe:
         display the board
         print either the contents or the name of the location
         '''
-        out = '\n' + \
-        '\t\t' + self.show_val(1,show_location) + '|' + self.show_val(2,show_location) + '|' + self.show_val(3,show_location) + '\n' + \
-        '\t\t' + '-+-+-\n' + \
-        '\t\t' + self.show_val(4,show_location) + '|' + self.show_val(5,show_location) + '|' + self.show_val(6,show_location) + '\n' + \
-        '\t\t' + '-+-+-\n' + \
-        '\t\t' + self.show_val(7,show_location) + '|' + self.show_val(8,show_location) + '|' + self.show_val(9,show_location)
+        width = len(str(self.rows * self.cols)) # widest location name
+        divider = '\t\t' + '+'.join('-' * width for _ in range(self.cols)) + '\n'
+        out = '\n' + divider.join(
+            '\t\t' + '|'.join(self.show_val(row * self.cols + col + 1, show_location).rjust(width) for col in range(self.cols)) + '\n'
+            for row in range(self.rows)
+        )[:-1] # no trailing newline
         
         print(out)
     
-    def is_location_playable(self, loc : int) -> bool:
-        '''
-        utility function to check if location is occupied
-        '''
-        return self.board[loc] == TicTacToe.empty_marker
-    
     def play_location(self, loc : int, player_marker : str, silent : bool = False) -> None:
         '''
         utility function to play a spot
@@ -157,10 +831,10 @@ class TicTacToe:
             
         # ensure input conversion works
         try:
-            location = int(input('enter 1-9 : '))
+            location = int(input(f'enter 1-{len(self.board)} : '))
             
-            if not (0 < location < 10):
-                msg = 'it\'s only 1-9, I told you already'
+            if location not in self.board:
+                msg = f'it\'s only 1-{len(self.board)}, I told you already'
                 self.human_turn(msg)
             else:
                 if not self.is_location_playable(location):
@@ -176,25 +850,8 @@ class TicTacToe:
         '''
         cpu player uses minimax algo to figure out optimal play
         '''
-        # initialize
-        best_score = -10000 # cpu wants to play MAX scoring position
-        best_move  = None # placeholder for best position found
-        
-        # iterate over all board locations
-        for loc in self.board.keys():
-            # only consider unoccupied locations
-            if self.is_location_playable(loc):
-                # figure out minimax score of playing here position
-                self.play_location(loc, TicTacToe.cpu_marker, silent = True) # temporarily play it
-                score = self.minimax(self.board,False) # compute minimax score of this play
-                self.play_location(loc, TicTacToe.empty_marker, silent = True) # roll it back as we only want to play the best position which is not necessarily this one
-                
-                # keep track of best playing position
-                if score > best_score:
-                    best_score = score
-                    best_move  = loc
-
-        # play best move
+        # play best move, looked up if the perfect play table is there, searched otherwise
+        best_move = self.table_move() or self.best_move()
         time.sleep(random.randint(1,2)) # make it seem like cpu is thinking
         self.play_location(best_move, TicTacToe.cpu_marker, silent = True)
 
@@ -214,76 +871,6 @@ class TicTacToe:
         elif msg_idx == 9: self.type_text('I can\'t lose btw')
 
         time.sleep(1) # pause after speaking
-        
-    def minimax(self, board, is_maximising : bool):
-        '''
-        implement recursive minimax algo to compute score of playing this board to termination
-        - cpu plays against itself
-        - both (cpu) players are trying to maximize their score (a win) / minimize their score (a lose)
-        '''
-        
-        # stopping conditions for recursion
-        if self.is_win_for_marker(TicTacToe.cpu_marker):
-            return 1 # like games where we win
-        elif self.is_win_for_marker(TicTacToe.human_marker):
-            return -1 # don't like games where we lose
-        elif self.no_more_moves():
-            return 0 # indifferent to games that are drawn
-
-        # both players        
-        if is_maximising:
-            # cpu wants to win
-            best_score = -1000
-            
-            for k in board.keys():
-                if self.is_location_playable(k):
-                    # temporarily play move
-                    self.play_location(k, TicTacToe.cpu_marker, silent = True)
-                    score = self.minimax(board,False)
-                    
-                    # roll it back
-                    self.play_location(k, TicTacToe.empty_marker, silent = True)
-                    if score > best_score: # "best score" needs to be maximal
-                        best_score = score
-                        
-            return best_score
-        else:
-            # cpu human wants to avoid losing
-            best_score = 1000
-            
-            for k in board.keys():
-                if self.is_location_playable(k):
-                    # temporarily play move
-                    self.play_location(k, TicTacToe.human_marker, silent = True)
-                    score = self.minimax(board,True)
-                    
-                    # roll it back
-                    self.play_location(k, TicTacToe.empty_marker, silent = True)
-                    if score < best_score: # "best score" needs to be minimal
-                        best_score = score
-    
-            return best_score
-        
-    def is_win_for_marker(self,player_marker : str):
-        '''
-        utility function to figure out if player with marker `player_marker` won
-        '''
-        # check all triplets for winning condition
-        if   player_marker == self.board[1] == self.board[2] == self.board[3]: return True # top row
-        elif player_marker == self.board[4] == self.board[5] == self.board[6]: return True # middle row
-        elif player_marker == self.board[7] == self.board[8] == self.board[9]: return True # bottom row
-        elif player_marker == self.board[1] == self.board[4] == self.board[7]: return True # leftmost col
-        elif player_marker == self.board[2] == self.board[5] == self.board[8]: return True # middle col
-        elif player_marker == self.board[3] == self.board[6] == self.board[9]: return True # rightmost col
-        elif player_marker == self.board[1] == self.board[5] == self.board[9]: return True # diag top-left to bottom-right
-        elif player_marker == self.board[7] == self.board[5] == self.board[3]: return True # diag bottom-left to top-right
-        else:                                                                  return False
-       
-    def no_more_moves(self):
-        '''
-        utility function to figure out if board is full, used to help identify a draw condition
-        '''
-        return not any(x == TicTacToe.empty_marker for x in self.board.values())
 
 '''
 requested entry point function
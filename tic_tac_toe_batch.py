@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+vectorized tic tac toe analysis of many boards at once
+
+boards are an (N, 9) int8 array, column loc-1 holds location loc
+    EMPTY = 0, X = 1 (the human, moves first), O = 2 (the cpu)
+the same digits as the base-3 index of the perfect play table
+
+    python tic_tac_toe_batch.py --boards 1000000   # boards / second of classify and lookahead
+
+one fancy index with the (8, 3) line-index matrix gathers every line of every board, (N, 8, 3),
+and a couple of comparisons across the last axis find the complete ones, no python loop per board
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Tuple
+import argparse
+import sys
+import time
+import numpy as np
+
+from tic_tac_toe import LINES,TicTacToeEngine
+
+########################################################
+# encoding
+########################################################
+EMPTY, X, O = 0, 1, 2
+ONGOING, X_WINS, O_WINS, DRAW, INVALID = 0, 1, 2, 3, 4 # status codes, X_WINS == X and O_WINS == O
+# INVALID: both players hold a complete line, which no real game reaches
+
+LINE_INDEX = np.array(LINES, dtype=np.intp) - 1 # (8, 3), columns of each winning line
+
+# try the center first, then corners, then edges, as the engine does, so ties go the same way
+PREFERENCE = np.array(TicTacToeEngine.move_preference, dtype=np.intp) - 1
+
+DIGITS = {
+    TicTacToeEngine.empty_marker : EMPTY,
+    TicTacToeEngine.human_marker : X,
+    TicTacToeEngine.cpu_marker   : O,
+}
+
+def encode(board) -> np.ndarray:
+    '''
+    (9,) int8 row of a BitBoard / dict board keyed 1-9
+    '''
+    return np.array([DIGITS[board[loc]] for loc in range(1,10)], dtype=np.int8)
+
+def as_boards(boards) -> np.ndarray:
+    '''
+    boards as an (N, 9) int8 array, a single (9,) board becomes (1, 9)
+
+    raises:
+        ValueError if the shape is wrong
+    '''
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim == 1:
+        boards = boards[None, :]
+    if boards.ndim != 2 or boards.shape[1] != 9:
+        raise ValueError(f'expected an (N, 9) array of boards, got shape {boards.shape}')
+    return boards
+
+########################################################
+# classification
+########################################################
+def lines_held(boards) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    (x holds a complete line, o holds a complete line), both (N,) bool
+    '''
+    boards = as_boards(boards)
+    lines = boards[:, LINE_INDEX] # (N, 8, 3)
+    first = lines[:, :, 0]
+    complete = (first == lines[:, :, 1]) & (first == lines[:, :, 2]) # (N, 8)
+    return (complete & (first == X)).any(axis=1), (complete & (first == O)).any(axis=1)
+
+def winners(boards) -> np.ndarray:
+    '''
+    (N,) int8, X or O for the player holding a complete line, EMPTY if nobody or both do
+    '''
+    return _winner(*lines_held(boards))
+
+def _winner(x_line : np.ndarray, o_line : np.ndarray) -> np.ndarray:
+    return np.where(x_line & ~o_line, X, np.where(o_line & ~x_line, O, EMPTY)).astype(np.int8)
+
+def classify(boards) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    (status, winner) of every board, both (N,) int8
+        status   ONGOING, X_WINS, O_WINS, DRAW or INVALID (both players have a line)
+        winner   X, O or EMPTY
+    '''
+    boards = as_boards(boards)
+    x_line, o_line = lines_held(boards)
+    winner = _winner(x_line, o_line)
+    full = (boards != EMPTY).all(axis=1)
+    status = np.where(x_line & o_line, INVALID, np.where(winner != EMPTY, winner, np.where(full, DRAW, ONGOING))).astype(np.int8)
+    return status, winner
+
+def score(boards) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    (scores, terminal) of every board, scores as in TicTacToeEngine.search (cpu point of view)
+        O wins   10 - # markers
+        X wins   # markers - 10
+        draw     0
+    ongoing boards score 0 with terminal False, invalid boards 0 with terminal True
+    '''
+    boards = as_boards(boards)
+    status, _ = classify(boards)
+    played = (boards != EMPTY).sum(axis=1, dtype=np.int8)
+    scores = np.zeros(len(boards), dtype=np.int8)
+    scores = np.where(status == O_WINS, 10 - played, scores)
+    scores = np.where(status == X_WINS, played - 10, scores).astype(np.int8)
+    return scores, status != ONGOING
+
+def side_to_move(boards) -> np.ndarray:
+    '''
+    (N,) int8, X when both players have as many markers, O otherwise
+    '''
+    boards = as_boards(boards)
+    return np.where((boards == X).sum(axis=1) == (boards == O).sum(axis=1), X, O).astype(np.int8)
+
+########################################################
+# one-ply lookahead
+########################################################
+def lookahead(boards, chunk_size : int = 1 << 16) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    best move and its score for the side to move of every board, looking one move ahead
+
+    every legal move is played, the resulting boards scored with score(): immediate wins are found,
+    everything else scores 0 and ties go to the engine's move preference
+    returns:
+        moves    (N,) int8, location 1-9, 0 if the board is already over
+        scores   (N,) int8, score of the board after that move, cpu point of view
+    boards are expanded chunk_size at a time, (chunk_size, 9, 9) children each
+    '''
+    boards = as_boards(boards)
+    moves = np.zeros(len(boards), dtype=np.int8)
+    scores = np.zeros(len(boards), dtype=np.int8)
+    for start in range(0, len(boards), chunk_size):
+        part = boards[start:start + chunk_size]
+        moves[start:start + len(part)], scores[start:start + len(part)] = _lookahead(part)
+    return moves, scores
+
+def _lookahead(boards : np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    n = len(boards)
+    mover = side_to_move(boards)
+    legal = boards[:, PREFERENCE] == EMPTY # (n, 9), columns in preference order
+
+    # child j of each board = the board with the mover on location PREFERENCE[j]
+    children = np.repeat(boards[:, None, :], 9, axis=1) # (n, 9, 9)
+    j = np.arange(9)
+    children[:, j, PREFERENCE] = np.where(legal, mover[:, None], EMPTY)
+    child_scores, _ = score(children.reshape(-1, 9))
+    child_scores = child_scores.reshape(n, 9).astype(np.int16)
+
+    # the cpu (O) maximises, the human (X) minimises, illegal moves never chosen
+    signed = np.where(mover[:, None] == O, child_scores, -child_scores)
+    signed = np.where(legal, signed, np.iinfo(np.int16).min)
+    best = signed.argmax(axis=1)
+
+    _, terminal = score(boards)
+    playable = legal.any(axis=1) & ~terminal
+    moves = np.where(playable, PREFERENCE[best] + 1, 0).astype(np.int8)
+    scores = np.where(playable, child_scores[np.arange(n), best], 0).astype(np.int8)
+    return moves, scores
+
+########################################################
+# main
+########################################################
+def random_boards(n : int, seed : int = 0) -> np.ndarray:
+    '''
+    n legal boards, each a random game of alternating X / O moves stopped after a random # of moves or at its first win
+    '''
+    rng = np.random.default_rng(seed)
+    order = rng.random((n, 9)).argsort(axis=1) # random location order per board
+    depth = rng.integers(0, 10, size=n)
+    turn = np.arange(9)
+    marker = np.where(turn % 2 == 0, X, O).astype(np.int8)
+    rows = np.arange(n)[:, None]
+
+    def replay(depth : np.ndarray) -> np.ndarray:
+        boards = np.zeros((n, 9), dtype=np.int8)
+        boards[rows, order] = np.where(turn[None, :] < depth[:, None], marker[None, :], EMPTY)
+        return boards
+
+    # nobody can win before move 5, so check the game after moves 5..8 and cut it at the first win
+    for moves in range(5, 9):
+        over = (winners(replay(np.minimum(depth, moves))) != EMPTY) & (depth > moves)
+        depth = np.where(over, moves, depth)
+    return replay(depth)
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='benchmark the vectorized tic tac toe evaluation')
+    parser.add_argument('--boards', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    boards = random_boards(args.boards, args.seed)
+    for name, fn in (('classify', classify), ('score', score), ('lookahead', lookahead)):
+        t0 = time.perf_counter()
+        fn(boards)
+        seconds = time.perf_counter() - t0
+        print(f'{name:10} {args.boards} boards in {seconds:.3f}s, {args.boards / seconds:,.0f} boards/s')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
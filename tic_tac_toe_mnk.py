@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+m,n,k game: tic tac toe on a rows x cols board where k in a row wins, e.g. 4x4 with k=4 or 7x7 with k=5
+
+    python tic_tac_toe_mnk.py                          # 4x4, 4 in a row, 1s per cpu move
+    python tic_tac_toe_mnk.py --rows 7 --cols 7 -k 5 --budget 2.5
+
+full minimax is out of reach beyond 3x3, so the cpu runs an iterative deepening alpha-beta search
+    depth 1, 2, 3, ... until the per-move time budget runs out, keeping the best move of the last finished depth
+    positions at the depth limit are scored by a heuristic counting open lines
+    wins are detected incrementally, only the lines through the last move are checked
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Tuple
+from functools import lru_cache
+import argparse
+import sys
+import time
+
+from tic_tac_toe import BitBoard,TicTacToeEngine,TicTacToe,SearchStats
+
+########################################################
+# geometry
+########################################################
+@lru_cache(maxsize=None)
+def line_indexes(rows : int, cols : int, k : int) -> Tuple:
+    '''
+    every k-in-a-row window of the board, as tuples of locations numbered 1..rows*cols
+    '''
+    directions = ((0,1),(1,0),(1,1),(1,-1)) # right, down, down-right, down-left
+    lines = []
+    for row in range(rows):
+        for col in range(cols):
+            for dr,dc in directions:
+                end_row, end_col = row + dr*(k-1), col + dc*(k-1)
+                if 0 <= end_row < rows and 0 <= end_col < cols:
+                    lines.append(tuple((row + dr*i) * cols + col + dc*i + 1 for i in range(k)))
+    return tuple(lines)
+
+@lru_cache(maxsize=None)
+def geometry(rows : int, cols : int, k : int) -> Dict:
+    '''
+    masks shared by every board of this shape
+
+    keys:
+        lines            k-in-a-row windows as location tuples
+        line_masks       the same windows as bit masks
+        masks_through    location -> masks of the windows through it, for incremental win checks
+        full             every location taken
+        not_first_col    locations outside the first column, to shift bits right without wrapping
+        not_last_col     locations outside the last column, to shift bits left without wrapping
+        preference       locations sorted by distance to the centre
+    '''
+    if not (0 < k <= max(rows, cols)):
+        raise ValueError(f'k={k} can never be reached on a {rows}x{cols} board')
+    lines = line_indexes(rows, cols, k)
+    line_masks = tuple(sum(1 << (loc-1) for loc in line) for line in lines)
+    masks_through = {
+        loc:tuple(mask for mask in line_masks if mask >> (loc-1) & 1)
+        for loc in range(1, rows*cols + 1)
+    }
+    column = lambda c: sum(1 << (row*cols + c) for row in range(rows))
+    full = (1 << rows*cols) - 1
+    centre_row, centre_col = (rows-1) / 2, (cols-1) / 2
+    preference = tuple(sorted(
+        range(1, rows*cols + 1),
+        key=lambda loc: abs((loc-1) // cols - centre_row) + abs((loc-1) % cols - centre_col),
+    ))
+    return {
+        'lines'         : lines,
+        'line_masks'    : line_masks,
+        'masks_through' : masks_through,
+        'full'          : full,
+        'not_first_col' : full & ~column(0),
+        'not_last_col'  : full & ~column(cols-1),
+        'preference'    : preference,
+    }
+
+def popcount(bits : int) -> int:
+    return bin(bits).count('1')
+
+########################################################
+# MNKBoard class
+########################################################
+class MNKBoard(BitBoard):
+    '''
+    BitBoard on a rows x cols board with k in a row, one arbitrary size int per player
+
+    usage:
+        board = MNKBoard(7,7,5)
+        board.move(25,'x')
+        board.wins_at(25,'x') # only checks the windows through location 25
+    '''
+
+    def __init__(self, rows : int = 4, cols : int = 4, k : int = 4, first_marker : str = 'x', second_marker : str = 'o', empty_marker : str = ' '):
+        super().__init__(first_marker, second_marker, empty_marker)
+        self.rows, self.cols, self.k = rows, cols, k
+        self.size = rows * cols
+        self.geometry = geometry(rows, cols, k)
+        self.lines = self.geometry['lines']
+        self.FULL = self.geometry['full']
+
+    def is_win(self, marker : str) -> bool:
+        bits = self.bits[marker]
+        return any(bits & mask == mask for mask in self.geometry['line_masks'])
+
+    def wins_at(self, loc : int, marker : str) -> bool:
+        '''
+        True if marker has k in a row through loc, enough to check right after marker played loc
+        '''
+        bits = self.bits[marker]
+        return any(bits & mask == mask for mask in self.geometry['masks_through'][loc])
+
+    def completes_line(self, loc : int, marker : str) -> bool:
+        bits = self.bits[marker] | 1 << (loc-1)
+        return any(bits & mask == mask for mask in self.geometry['masks_through'][loc])
+
+    def count(self) -> int:
+        return popcount(self.occupied())
+
+    def neighbourhood(self) -> int:
+        '''
+        mask of the locations next to (or on) a marker, diagonals included
+        '''
+        bits = self.occupied()
+        g = self.geometry
+        row = bits | (bits << 1) & g['not_first_col'] | (bits >> 1) & g['not_last_col']
+        return (row | row << self.cols | row >> self.cols) & g['full']
+
+########################################################
+# MNKEngine class
+########################################################
+class SearchTimeout(Exception):
+    '''
+    raised inside the search when the time budget of the move is spent
+    '''
+
+class MNKEngine(TicTacToeEngine):
+    '''
+    TicTacToeEngine on a rows x cols board with k in a row, moves found by iterative deepening alpha-beta
+
+    args:
+        rows, cols, k
+            board shape and # markers in a row that win
+        time_budget
+            seconds the search may take per move, the depth 1 search always finishes
+        max_depth
+            deepest iteration, at least 1, defaults to the # locations
+        near_only
+            only search moves next to a marker, much deeper searches but no longer exact
+            defaults to True beyond 3x3, where exact play matters and the tree is small anyway
+    '''
+
+    win_score = 1000000 # any win outranks any heuristic score
+    check_every = 1024 # nodes between two looks at the clock
+
+    def __init__(self, rows : int = 4, cols : int = 4, k : int = 4, time_budget : float = 1.0, max_depth : int = None, near_only : bool = None, stats : SearchStats = None):
+        geometry(rows, cols, k) # validate the shape early
+        if max_depth is not None and max_depth < 1:
+            raise ValueError(f'max_depth must be at least 1, got {max_depth}')
+        self.rows, self.cols, self.k = rows, cols, k
+        self.time_budget = time_budget
+        self.max_depth = rows * cols if max_depth is None else max_depth
+        self.near_only = rows * cols > 9 if near_only is None else near_only
+        self.depth_reached = 0 # deepest finished iteration of the last best_move
+        self.deadline = None
+        super().__init__(stats) # creates the board, so after the shape is known
+
+    def create_board(self) -> MNKBoard:
+        return MNKBoard(self.rows, self.cols, self.k, TicTacToeEngine.human_marker, TicTacToeEngine.cpu_marker, TicTacToeEngine.empty_marker)
+
+    def table_move(self, player_marker : str = None):
+        return None # the perfect play table only covers 3x3
+
+    def best_move(self, player_marker : str = None) -> int:
+        '''
+        best location for player_marker (the cpu by default)
+
+        iterative deepening: search depth 1, 2, ... until time_budget runs out or a forced result is found
+        each iteration searches the previous best move first, so alpha-beta prunes the rest harder
+        '''
+        self.nodes_searched = 0
+        self.depth_reached  = 0
+        self.deadline = time.perf_counter() + self.time_budget
+        if self.stats is not None:
+            self.stats.start(self.board.count())
+        player_marker = player_marker or TicTacToeEngine.cpu_marker
+        moves = self.ordered_moves(player_marker)
+        best_move = moves[0]
+        position = dict(self.board.bits)
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self.search_root(moves, depth, player_marker)
+            except SearchTimeout:
+                self.board.bits.update(position) # moves being tried when time ran out are still on the board
+                break # unfinished iteration, keep the previous answer
+            best_move, self.depth_reached = move, depth
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(score) >= self.win_score - self.rows * self.cols or depth >= self.board.size - self.board.count():
+                break # forced win / loss found, or the whole game tree was searched
+        return best_move
+
+    def search_root(self, moves : List, depth : int, player_marker : str) -> Tuple:
+        '''
+        (best score, best move) of searching every root move of player_marker to depth
+        the cpu maximises the score, the human minimises it
+        '''
+        is_cpu = player_marker == TicTacToeEngine.cpu_marker
+        best_score, best_move = (-self.win_score * 2 if is_cpu else self.win_score * 2), moves[0]
+        root_moves = [] # stats of this iteration, kept only if it finishes
+        for loc in moves:
+            t0, nodes = time.perf_counter(), self.nodes_searched
+            self.board.move(loc, player_marker)
+            if is_cpu:
+                score = self.alphabeta(depth - 1, False, best_score, self.win_score * 2, loc)
+            else:
+                score = self.alphabeta(depth - 1, True, -self.win_score * 2, best_score, loc)
+            self.board.undo(loc, player_marker)
+            if score > best_score if is_cpu else score < best_score:
+                best_score, best_move = score, loc
+            root_moves.append({'move':loc, 'score':score, 'seconds':time.perf_counter() - t0, 'nodes':self.nodes_searched - nodes})
+        if self.stats is not None:
+            self.stats.root_moves = root_moves
+        return best_score, best_move
+
+    def alphabeta(self, depth : int, is_maximising : bool, alpha : float, beta : float, last_move : int) -> float:
+        '''
+        depth limited alpha-beta, last_move was just played by the other side
+        '''
+        self.nodes_searched += 1
+        if self.nodes_searched % self.check_every == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        stats = self.stats
+        board = self.board
+        if stats is not None:
+            stats.node(board.count())
+            stats.terminal_checks += 1
+
+        # stopping conditions, only lines through the last move can have been completed
+        if board.wins_at(last_move, TicTacToeEngine.human_marker if is_maximising else TicTacToeEngine.cpu_marker):
+            if stats is not None:
+                stats.terminals += 1
+            played = board.count()
+            return played - self.win_score if is_maximising else self.win_score - played # sooner wins score higher
+        elif board.is_full():
+            if stats is not None:
+                stats.terminals += 1
+            return 0
+        elif depth == 0:
+            return self.evaluate()
+
+        marker = TicTacToeEngine.cpu_marker if is_maximising else TicTacToeEngine.human_marker
+        best_score = -self.win_score * 2 if is_maximising else self.win_score * 2
+        for loc in self.ordered_moves(marker):
+            board.move(loc, marker)
+            score = self.alphabeta(depth - 1, not is_maximising, alpha, beta, loc)
+            board.undo(loc, marker)
+            if is_maximising:
+                best_score = max(best_score, score)
+                alpha = max(alpha, best_score)
+            else:
+                best_score = min(best_score, score)
+                beta = min(beta, best_score)
+            if alpha >= beta:
+                break
+        return best_score
+
+    def evaluate(self) -> int:
+        '''
+        heuristic score from the cpu point of view
+        every window still open to one player only is worth 4 ** (# of its markers in it) to that player
+        '''
+        cpu   = self.board.bits[TicTacToeEngine.cpu_marker]
+        human = self.board.bits[TicTacToeEngine.human_marker]
+        score = 0
+        for mask in self.board.geometry['line_masks']:
+            mine, theirs = cpu & mask, human & mask
+            if mine and not theirs:
+                score += 4 ** popcount(mine)
+            elif theirs and not mine:
+                score -= 4 ** popcount(theirs)
+        return score
+
+    def ordered_moves(self, player_marker : str) -> list:
+        '''
+        candidate locations, good moves first
+            (1) moves that win on the spot for player_marker
+            (2) moves that block an immediate win of the opponent
+            (3) the rest, closest to the centre first
+        with near_only, only locations next to a marker are candidates, far away moves are almost never better
+        '''
+        board = self.board
+        free = board.legal_moves_mask()
+        near = free & board.neighbourhood() if self.near_only else 0
+        candidates = near if near else free # empty board, or every move wanted
+        opponent_marker = TicTacToeEngine.human_marker if player_marker == TicTacToeEngine.cpu_marker else TicTacToeEngine.cpu_marker
+        wins, blocks, rest = [], [], []
+        for loc in board.geometry['preference']:
+            if not candidates >> (loc-1) & 1:
+                continue
+            if board.completes_line(loc, player_marker):
+                wins.append(loc)
+            elif board.completes_line(loc, opponent_marker):
+                blocks.append(loc)
+            else:
+                rest.append(loc)
+        return wins + blocks + rest
+
+########################################################
+# MNKTicTacToe class
+########################################################
+class MNKTicTacToe(MNKEngine, TicTacToe):
+    '''
+    console game on a rows x cols board, MNKEngine search with the TicTacToe chit-chat
+    '''
+
+########################################################
+# main
+########################################################
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='play tic tac toe on a bigger board')
+    parser.add_argument('--rows', type=int, default=4)
+    parser.add_argument('--cols', type=int, default=4)
+    parser.add_argument('-k', type=int, default=4, help='# in a row that wins')
+    parser.add_argument('--budget', type=float, default=1.0, help='seconds the cpu thinks per move')
+    args = parser.parse_args(argv)
+    MNKTicTacToe(args.rows, args.cols, args.k, args.budget).play_game()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+engine vs engine games, no typing, no sleeps, no input()
+
+    python tic_tac_toe_selfplay.py --games 10000                        # minimax vs minimax, all draws
+    python tic_tac_toe_selfplay.py --games 10000 --x random --o minimax --seed 1
+    python tic_tac_toe_selfplay.py --games 100 --x scripted --script 1 9 3 --o minimax
+    python tic_tac_toe_selfplay.py --games 1000 --x depth2 --o minimax~0.1
+
+a player is any callable taking the TicTacToeEngine and returning the location to play for engine.to_move()
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Callable,Iterable
+import argparse
+import random
+import sys
+import time
+
+from tic_tac_toe import TicTacToeEngine
+from tic_tac_toe_mnk import MNKEngine
+
+########################################################
+# players
+########################################################
+class Player:
+    '''
+    base class, subclasses implement __call__(engine) -> location
+    '''
+    name = 'player'
+
+    def reset(self) -> None:
+        '''
+        called before every game
+        '''
+
+    def __call__(self, engine : TicTacToeEngine) -> int:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return self.name
+
+class MinimaxPlayer(Player):
+    '''
+    perfect play, from the perfect play table when use_table and it is there, from the live search otherwise
+    '''
+    name = 'minimax'
+
+    def __init__(self, use_table : bool = True):
+        self.use_table = use_table
+        self.name = 'minimax' if use_table else 'search'
+
+    def __call__(self, engine : TicTacToeEngine) -> int:
+        marker = engine.to_move()
+        return (self.use_table and engine.table_move(marker)) or engine.best_move(marker)
+
+class RandomPlayer(Player):
+    '''
+    uniformly random legal move
+    '''
+    name = 'random'
+
+    def __init__(self, seed = None):
+        self.rng = random.Random(seed)
+
+    def __call__(self, engine : TicTacToeEngine) -> int:
+        return self.rng.choice(engine.legal_moves())
+
+class ScriptedPlayer(Player):
+    '''
+    plays `moves` in order every game, skipping the taken ones, then hands over to fallback
+    fallback defaults to the first legal move
+    '''
+    name = 'scripted'
+
+    def __init__(self, moves : Iterable, fallback : Callable = None):
+        self.moves = list(moves)
+        self.fallback = fallback
+        self.next = 0
+
+    def reset(self) -> None:
+        self.next = 0
+        if isinstance(self.fallback, Player):
+            self.fallback.reset()
+
+    def __call__(self, engine : TicTacToeEngine) -> int:
+        while self.next < len(self.moves):
+            loc = self.moves[self.next]
+            self.next += 1
+            if engine.is_location_playable(loc):
+                return loc
+        return self.fallback(engine) if self.fallback else engine.legal_moves()[0]
+
+class DepthLimitedPlayer(Player):
+    '''
+    alpha-beta cut off after max_depth plies, positions beyond scored by the open lines heuristic
+    runs its own MNKEngine (same board shape as the game) and adds its nodes to engine.nodes_searched
+    '''
+
+    def __init__(self, max_depth : int, time_budget : float = float('inf')):
+        if max_depth < 1:
+            raise ValueError(f'max_depth must be at least 1, got {max_depth}')
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.search = None # MNKEngine, made on the first move once the board shape is known
+        self.name = f'depth{max_depth}'
+
+    def __call__(self, engine : TicTacToeEngine) -> int:
+        if self.search is None:
+            self.search = MNKEngine(engine.rows, engine.cols, engine.k, self.time_budget, self.max_depth)
+        self.search.board.bits.update(engine.board.bits)
+        move = self.search.best_move(engine.to_move())
+        engine.nodes_searched += self.search.nodes_searched
+        return move
+
+class NoisyPlayer(Player):
+    '''
+    plays a random move with probability epsilon, asks player otherwise
+    '''
+
+    def __init__(self, player : Callable, epsilon : float, seed = None):
+        self.player = player
+        self.epsilon = epsilon
+        self.rng = random.Random(seed)
+        self.name = f'{player!r}~{epsilon:g}'
+
+    def reset(self) -> None:
+        if isinstance(self.player, Player):
+            self.player.reset()
+
+    def __call__(self, engine : TicTacToeEngine) -> int:
+        if self.rng.random() < self.epsilon:
+            return self.rng.choice(engine.legal_moves())
+        return self.player(engine)
+
+PLAYERS : Dict = {
+    'minimax'  : MinimaxPlayer,
+    'search'   : lambda: MinimaxPlayer(use_table=False),
+    'random'   : RandomPlayer,
+    'scripted' : ScriptedPlayer,
+}
+
+def make_player(spec : str, seed = None, script : List = None) -> Player:
+    '''
+    player from its spec string
+        minimax, search, random, scripted   see PLAYERS, scripted plays script then random moves
+        depthN                              alpha-beta cut off after N plies, e.g. depth2
+        <spec>~E                            <spec> playing a random move with probability E, e.g. minimax~0.1
+
+    raises:
+        ValueError on an unknown spec
+    '''
+    base, _, epsilon = spec.partition('~')
+    if epsilon:
+        return NoisyPlayer(make_player(base, seed, script), float(epsilon), seed)
+    if base == 'random':
+        return RandomPlayer(seed)
+    if base == 'scripted':
+        return ScriptedPlayer(script or [], RandomPlayer(seed))
+    if base.startswith('depth') and base[5:].isdigit():
+        return DepthLimitedPlayer(int(base[5:]))
+    if base in PLAYERS:
+        return PLAYERS[base]()
+    raise ValueError(f'unknown player {spec!r}')
+
+########################################################
+# games
+########################################################
+def play(engine : TicTacToeEngine, x_player : Callable, o_player : Callable, on_move : Callable = None) -> tuple:
+    '''
+    play one game from an empty board, x (the `human` marker) first
+    returns (winner marker or None for a draw, list of locations played)
+
+    on_move
+        optional on_move(marker, location, seconds, nodes) called after every move,
+        with the time the player took and the engine.nodes_searched it reported
+    '''
+    engine.reset()
+    players = {TicTacToeEngine.human_marker:x_player, TicTacToeEngine.cpu_marker:o_player}
+    for player in players.values():
+        if isinstance(player, Player):
+            player.reset()
+    if on_move is None:
+        while not engine.is_over():
+            engine.apply(players[engine.to_move()](engine))
+    else:
+        while not engine.is_over():
+            marker = engine.to_move()
+            engine.nodes_searched = 0
+            t0 = time.perf_counter()
+            loc = players[marker](engine)
+            seconds = time.perf_counter() - t0
+            engine.apply(loc)
+            on_move(marker, loc, seconds, engine.nodes_searched)
+    return engine.winner(), list(engine.history)
+
+def self_play(games : int, x_player : Callable, o_player : Callable, engine : TicTacToeEngine = None) -> Dict:
+    '''
+    play `games` games between the same two players, returns the tally and the throughput
+    '''
+    engine = engine or TicTacToeEngine()
+    tally = {TicTacToeEngine.human_marker:0, TicTacToeEngine.cpu_marker:0, 'draw':0}
+    t0 = time.perf_counter()
+    for _ in range(games):
+        winner, _ = play(engine, x_player, o_player)
+        tally[winner or 'draw'] += 1
+    seconds = time.perf_counter() - t0
+    return {
+        'games'            : games,
+        'x_player'         : repr(x_player),
+        'o_player'         : repr(o_player),
+        'x_wins'           : tally[TicTacToeEngine.human_marker],
+        'o_wins'           : tally[TicTacToeEngine.cpu_marker],
+        'draws'            : tally['draw'],
+        'seconds'          : seconds,
+        'games_per_second' : games / seconds if seconds else float('inf'),
+    }
+
+########################################################
+# main
+########################################################
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='tic tac toe self-play')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--x', default='minimax', help='first player spec, see make_player')
+    parser.add_argument('--o', default='minimax', help='second player spec, see make_player')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random players')
+    parser.add_argument('--script', type=int, nargs='+', help='locations of the scripted players, random after that')
+    args = parser.parse_args(argv)
+
+    try:
+        x_player = make_player(args.x, args.seed, args.script)
+        o_player = make_player(args.o, None if args.seed is None else args.seed + 1, args.script)
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    result = self_play(args.games, x_player, o_player)
+    print(
+        f"{result['games']} games {result['x_player']} (x) vs {result['o_player']} (o): "
+        f"x wins {result['x_wins']}, o wins {result['o_wins']}, draws {result['draws']}, "
+        f"{result['games_per_second']:.0f} games/s"
+    )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio TCP server hosting many tic tac toe games at once, one text line per request and per reply
+
+    python tic_tac_toe_server.py --port 7777                  # serve until ^C
+    python tic_tac_toe_server.py --selftest --clients 2000    # serve on a free local port and play random local clients against it
+
+protocol (case insensitive verbs, one reply line per request line)
+    NEW [x|o] [rows cols k]   new game, you play x (moves first) or o, 3x3 unless a shape is given
+                              reply OK <cpu move or -> <board> <status>
+    MOVE <loc>                play loc (1..rows*cols), the cpu answers straight away
+                              reply OK <cpu move or -> <board> <status>
+    BOARD                     reply OK - <board> <status>
+    STATS                     reply OK <json> with this session's and the server's metrics
+    QUIT                      reply BYE and close
+    anything wrong            reply ERR <reason>, the session carries on
+board is one string per row joined by '/', '.' for empty, e.g. x../.o./...
+status is one of ongoing, x-wins, o-wins, draw
+
+all sessions share the process wide search cache (TicTacToeEngine.transpositions) and the perfect play table
+table lookups are answered inline, live searches run on a single worker thread
+so the event loop never stalls on a search, and the shared cache is never touched by two searches at once
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+
+from tic_tac_toe import TicTacToeEngine,MoveStats
+from tic_tac_toe_mnk import MNKEngine
+
+GREETING = 'HELLO tic-tac-toe 1'
+
+########################################################
+# sessions
+########################################################
+class Session:
+    '''
+    one connection: its current game and its metrics
+    '''
+    ids = itertools.count(1)
+
+    def __init__(self, peer):
+        self.id = next(Session.ids)
+        self.peer = peer
+        self.engine = None # TicTacToeEngine / MNKEngine of the current game
+        self.side = None # marker the client plays
+        self.games = 0
+        self.latency = MoveStats() # seconds from request read to reply written, nodes searched per request
+
+    def status(self) -> str:
+        winner = self.engine.winner()
+        if winner is not None:
+            return f'{winner}-wins'
+        return 'draw' if self.engine.no_more_moves() else 'ongoing'
+
+    def board(self) -> str:
+        engine = self.engine
+        rows = []
+        for row in range(engine.rows):
+            cells = (engine.board[row * engine.cols + col + 1] for col in range(engine.cols))
+            rows.append(''.join('.' if cell == engine.empty_marker else cell for cell in cells))
+        return '/'.join(rows)
+
+    def metrics(self) -> Dict:
+        return {
+            'id'       : self.id,
+            'games'    : self.games,
+            'requests' : self.latency.moves,
+            'nodes'    : self.latency.nodes,
+            'p50_ms'   : self.latency.percentile(50) * 1e3,
+            'p99_ms'   : self.latency.percentile(99) * 1e3,
+        }
+
+class ProtocolError(ValueError):
+    '''
+    bad request, answered with ERR
+    '''
+
+########################################################
+# server
+########################################################
+class GameServer:
+    '''
+    line protocol game server, see the module docstring
+
+    usage:
+        server = GameServer(port=0)
+        host, port = await server.start()
+        ...
+        await server.close()
+
+    args:
+        host, port
+            where to listen, port 0 picks a free one
+        time_budget
+            seconds per cpu move on boards bigger than 3x3
+        max_cells
+            largest rows * cols a client may ask for
+    '''
+
+    def __init__(self, host : str = '127.0.0.1', port : int = 0, time_budget : float = 0.2, max_cells : int = 64):
+        self.host, self.port = host, port
+        self.time_budget = time_budget
+        self.max_cells = max_cells
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search')
+        self.sessions : Dict = {} # id -> Session, open connections only
+        self.server = None
+        self.sessions_total = 0
+        self.games_total = 0
+        self.searches = 0 # cpu moves that needed the executor
+        self.latency = MoveStats() # every request of every session
+        self.loop_lag = 0.0 # worst delay seen by the event loop watchdog, seconds
+        self.watchdog = None
+        TicTacToeEngine.load_table()
+
+    async def start(self) -> tuple:
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, backlog=4096)
+        self.host, self.port = self.server.sockets[0].getsockname()[:2]
+        self.watchdog = asyncio.get_running_loop().create_task(self.watch_loop())
+        return self.host, self.port
+
+    async def watch_loop(self, interval : float = 0.01) -> None:
+        '''
+        sleep `interval` over and over, any extra delay is time the event loop was blocked
+        '''
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(self.loop_lag, loop.time() - t0 - interval)
+
+    async def serve_forever(self) -> None:
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    def metrics(self) -> Dict:
+        '''
+        aggregate metrics over every session since the server started
+        '''
+        return {
+            'sessions_open'  : len(self.sessions),
+            'sessions_total' : self.sessions_total,
+            'games'          : self.games_total,
+            'requests'       : self.latency.moves,
+            'searches'       : self.searches,
+            'nodes'          : self.latency.nodes,
+            'p50_ms'         : self.latency.percentile(50) * 1e3,
+            'p90_ms'         : self.latency.percentile(90) * 1e3,
+            'p99_ms'         : self.latency.percentile(99) * 1e3,
+            'loop_lag_ms'    : self.loop_lag * 1e3,
+            'cache_entries'  : len(TicTacToeEngine.transpositions),
+        }
+
+    # connection
+    async def handle(self, reader : asyncio.StreamReader, writer : asyncio.StreamWriter) -> None:
+        session = Session(writer.get_extra_info('peername'))
+        self.sessions[session.id] = session
+        self.sessions_total += 1
+        try:
+            writer.write((GREETING + '\n').encode())
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break # client went away
+                t0 = time.perf_counter()
+                try:
+                    reply, nodes = await self.request(session, line.decode('utf-8', 'replace').strip())
+                except ProtocolError as e:
+                    reply, nodes = f'ERR {e}', 0
+                writer.write((reply + '\n').encode())
+                await writer.drain()
+                seconds = time.perf_counter() - t0
+                session.latency.record(seconds, nodes)
+                self.latency.record(seconds, nodes)
+                if reply == 'BYE':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            del self.sessions[session.id]
+            writer.close()
+
+    # requests
+    async def request(self, session : Session, line : str) -> tuple:
+        '''
+        (reply line, # nodes searched) of one request line
+        '''
+        verb, *args = line.split() or ['']
+        verb = verb.upper()
+        if verb == 'NEW':
+            return await self.new_game(session, args)
+        if verb == 'MOVE':
+            return await self.move(session, args)
+        if verb == 'BOARD':
+            self.need_game(session)
+            return f'OK - {session.board()} {session.status()}', 0
+        if verb == 'STATS':
+            return 'OK ' + json.dumps({'session':session.metrics(), 'server':self.metrics()}), 0
+        if verb == 'QUIT':
+            return 'BYE', 0
+        raise ProtocolError(f'unknown request {verb!r}, expected NEW, MOVE, BOARD, STATS or QUIT')
+
+    def need_game(self, session : Session) -> None:
+        if session.engine is None:
+            raise ProtocolError('no game, send NEW first')
+
+    async def new_game(self, session : Session, args : list) -> tuple:
+        side = args[0].lower() if args else TicTacToeEngine.human_marker
+        if side not in (TicTacToeEngine.human_marker, TicTacToeEngine.cpu_marker):
+            raise ProtocolError(f'side must be {TicTacToeEngine.human_marker} or {TicTacToeEngine.cpu_marker}')
+        if len(args) not in (0, 1, 4):
+            raise ProtocolError('usage: NEW [x|o] [rows cols k]')
+        if len(args) == 4:
+            try:
+                rows, cols, k = map(int, args[1:])
+                if not (0 < rows * cols <= self.max_cells) or rows < 1 or cols < 1:
+                    raise ValueError(f'boards are limited to {self.max_cells} cells')
+                engine = MNKEngine(rows, cols, k, self.time_budget)
+            except ValueError as e:
+                raise ProtocolError(f'bad shape: {e}')
+        else:
+            engine = TicTacToeEngine()
+        session.engine, session.side = engine, side
+        session.games += 1
+        self.games_total += 1
+
+        cpu_move, nodes = '-', 0
+        if engine.to_move() != side: # the client plays second
+            cpu_move, nodes = await self.cpu_move(session)
+        return f'OK {cpu_move} {session.board()} {session.status()}', nodes
+
+    async def move(self, session : Session, args : list) -> tuple:
+        self.need_game(session)
+        engine = session.engine
+        if engine.is_over():
+            raise ProtocolError('game over, send NEW')
+        if len(args) != 1 or not args[0].isdigit():
+            raise ProtocolError('usage: MOVE <loc>')
+        try:
+            engine.apply(int(args[0]))
+        except ValueError as e:
+            raise ProtocolError(str(e))
+
+        cpu_move, nodes = '-', 0
+        if not engine.is_over():
+            cpu_move, nodes = await self.cpu_move(session)
+        return f'OK {cpu_move} {session.board()} {session.status()}', nodes
+
+    async def cpu_move(self, session : Session) -> tuple:
+        '''
+        play the cpu side, (move, # nodes searched)
+        table lookups inline, searches on the executor so other sessions keep being served meanwhile
+        '''
+        engine = session.engine
+        marker = engine.to_move()
+        loc = engine.table_move(marker)
+        nodes = 0
+        if loc is None:
+            self.searches += 1
+            loc = await asyncio.get_running_loop().run_in_executor(self.executor, engine.best_move, marker)
+            nodes = engine.nodes_searched
+        engine.apply(loc)
+        return loc, nodes
+
+########################################################
+# local clients
+########################################################
+async def random_client(host : str, port : int, games : int, seed = None, shape : str = '') -> Dict:
+    '''
+    connect, play `games` games of random moves as x, return this session's metrics from STATS
+    '''
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def ask(line : str) -> str:
+        writer.write((line + '\n').encode())
+        await writer.drain()
+        reply = (await reader.readline()).decode().strip()
+        if not reply.startswith(('OK','BYE')):
+            raise RuntimeError(f'{line!r} -> {reply!r}')
+        return reply
+
+    await reader.readline() # greeting
+    for _ in range(games):
+        _, _, board, status = (await ask(f'NEW x {shape}'.strip())).split()
+        while status == 'ongoing':
+            free = [i + 1 for i,cell in enumerate(board.replace('/','')) if cell == '.']
+            _, _, board, status = (await ask(f'MOVE {rng.choice(free)}')).split()
+    stats = json.loads((await ask('STATS'))[3:])
+    await ask('QUIT')
+    writer.close()
+    return stats
+
+async def selftest(clients : int, games : int, shape : str = '', time_budget : float = 0.2) -> Dict:
+    '''
+    start a server on a free local port and run `clients` random clients against it concurrently
+    '''
+    server = GameServer(port=0, time_budget=time_budget)
+    host, port = await server.start()
+    t0 = time.perf_counter()
+    try:
+        await asyncio.gather(*(random_client(host, port, games, seed, shape) for seed in range(clients)))
+    finally:
+        await server.close()
+    out = server.metrics()
+    out['seconds'] = time.perf_counter() - t0
+    return out
+
+########################################################
+# main
+########################################################
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='tic tac toe line protocol server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--budget', type=float, default=0.2, help='seconds per cpu move on boards bigger than 3x3')
+    parser.add_argument('--selftest', action='store_true', help='play local random clients against a server on a free port')
+    parser.add_argument('--clients', type=int, default=1000, help='selftest: concurrent clients')
+    parser.add_argument('--games', type=int, default=3, help='selftest: games per client')
+    parser.add_argument('--shape', default='', help="selftest: 'rows cols k' of the games, 3x3 by default")
+    args = parser.parse_args(argv)
+
+    if args.selftest:
+        print(json.dumps(asyncio.run(selftest(args.clients, args.games, args.shape, args.budget)), indent=1))
+        return 0
+
+    server = GameServer(args.host, args.port, args.budget)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
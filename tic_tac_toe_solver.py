@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+offline solver writing the perfect play table read by TicTacToeEngine.table_move
+
+    python tic_tac_toe_solver.py                       # writes tic_tac_toe.table next to tic_tac_toe.py
+    python tic_tac_toe_solver.py --output other.table
+
+every position reachable from the empty board (human first) is solved once by plain minimax,
+with the same scores as TicTacToeEngine.minimax (cpu wins 10 - # markers, human wins # markers - 10, draws 0)
+the best move and score of each are packed into a 2 byte entry indexed by the base-3 board encoding,
+see tic_tac_toe.PlayTable for the layout
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict
+import argparse
+import os
+import sys
+import time
+
+from tic_tac_toe import (
+    BitBoard,TicTacToeEngine,PlayTable,
+    TABLE_MAGIC,TABLE_VERSION,TABLE_HEADER,TABLE_ENTRIES,TABLE_FINGERPRINT,
+)
+
+########################################################
+# solver
+########################################################
+def solve() -> Dict:
+    '''
+    dict base-3 index -> (best location, score) for every reachable board, location 0 on terminal boards
+    the side to move follows from the board, the human when both players have as many markers
+    '''
+    human, cpu = TicTacToeEngine.human_marker, TicTacToeEngine.cpu_marker
+    board = BitBoard(human, cpu, TicTacToeEngine.empty_marker)
+    solved : Dict = {}
+
+    def visit() -> int:
+        index = PlayTable.index(board)
+        if index in solved:
+            return solved[index][1]
+
+        played = board.count()
+        if board.is_win(cpu):
+            best = 0, 10 - played
+        elif board.is_win(human):
+            best = 0, played - 10
+        elif board.is_full():
+            best = 0, 0
+        else:
+            maximising = played % 2 == 1 # the cpu moves second
+            marker = cpu if maximising else human
+            free = board.legal_moves_mask()
+            best = None
+            for loc in TicTacToeEngine.move_preference: # ties go to the preferred location
+                if not free >> (loc-1) & 1:
+                    continue
+                board.move(loc, marker)
+                score = visit()
+                board.undo(loc, marker)
+                if best is None or (score > best[1] if maximising else score < best[1]):
+                    best = loc, score
+
+        solved[index] = best
+        return best[1]
+
+    visit()
+    return solved
+
+def board_from_index(index : int) -> BitBoard:
+    '''
+    inverse of PlayTable.index
+    '''
+    board = BitBoard(TicTacToeEngine.human_marker, TicTacToeEngine.cpu_marker, TicTacToeEngine.empty_marker)
+    for loc in range(1,10):
+        index, digit = divmod(index, 3)
+        if digit == 1:
+            board.move(loc, TicTacToeEngine.human_marker)
+        elif digit == 2:
+            board.move(loc, TicTacToeEngine.cpu_marker)
+    return board
+
+def pack(solved : Dict) -> bytes:
+    '''
+    header + one (location, signed score) byte pair per base-3 index
+    '''
+    body = bytearray(2 * TABLE_ENTRIES)
+    for index,(loc,score) in solved.items():
+        body[2*index]   = loc
+        body[2*index+1] = score & 0xFF
+    return TABLE_HEADER.pack(TABLE_MAGIC, TABLE_VERSION, TABLE_ENTRIES, TABLE_FINGERPRINT) + bytes(body)
+
+def write_table(path : str) -> int:
+    '''
+    solve the game and write the table to path, returns # positions solved
+    written to a temporary file first, so a process mapping the old table never sees a half written one
+    '''
+    solved = solve()
+    tmp = path + '.tmp'
+    with open(tmp,'wb') as f:
+        f.write(pack(solved))
+    os.replace(tmp, path)
+    return len(solved)
+
+########################################################
+# main
+########################################################
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='solve tic tac toe and write the perfect play table')
+    parser.add_argument('--output', default=TicTacToeEngine.table_path, help='table file (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    positions = write_table(args.output)
+    print(f'{positions} positions solved in {time.perf_counter() - t0:.3f}s, {os.path.getsize(args.output)} bytes written to {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
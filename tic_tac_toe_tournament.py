@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+engine vs engine tournament over a process pool
+
+    python tic_tac_toe_tournament.py --players minimax depth2 random --games 100000
+    python tic_tac_toe_tournament.py --players minimax minimax~0.1 --games 1000000 --output long.jsonl  # ^C, rerun to resume
+
+every ordered pair of players (both colours) plays --games games, split into batches of --batch games
+batches are sharded across --workers processes, each warmed once (perfect play table mapped, search cache filled)
+every finished batch is appended to the JSON Lines --output as it arrives, so an interrupted run is resumed
+by rerunning the same command: batches already in the file are skipped and counted in the totals
+a batch only counts if its record has the same --games, --batch and --seed as the current run,
+records of other settings or other matchups stay in the file but are ignored
+
+player specs (tic_tac_toe_selfplay.make_player)
+    minimax        table, then live search
+    search         live search only
+    random         uniformly random
+    depthN         alpha-beta cut off after N plies, e.g. depth2
+    <spec>~E       <spec> playing a random move with probability E, e.g. minimax~0.1
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Iterator
+from concurrent.futures import ProcessPoolExecutor,as_completed
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from tic_tac_toe import TicTacToeEngine,MoveStats
+from tic_tac_toe_selfplay import make_player,play
+
+########################################################
+# workers
+########################################################
+_engine = None # per worker process
+
+def warm_worker() -> None:
+    '''
+    process pool initializer: map the perfect play table and fill the transposition table
+    so the first batches are not paying for the cold search
+    '''
+    global _engine
+    _engine = TicTacToeEngine()
+    for loc in TicTacToeEngine.move_preference: # every opening, and the best reply to each
+        _engine.best_move(TicTacToeEngine.human_marker)
+        _engine.apply(loc)
+        _engine.best_move(TicTacToeEngine.cpu_marker)
+        _engine.reset()
+
+def batch_seed(seed : int, matchup : str, batch : int) -> int:
+    '''
+    deterministic seed of one batch, so a resumed run plays the same games
+    '''
+    return random.Random(f'{seed}:{matchup}:{batch}').getrandbits(32)
+
+def run_batch(x_spec : str, o_spec : str, batch : int, games : int, seed : int, batch_size : int) -> Dict:
+    '''
+    play one batch in this process, returns the JSON Lines record
+    '''
+    if _engine is None:
+        warm_worker()
+    matchup = f'{x_spec} vs {o_spec}'
+    rng = random.Random(batch_seed(seed, matchup, batch))
+    x_player = make_player(x_spec, rng.getrandbits(32))
+    o_player = make_player(o_spec, rng.getrandbits(32))
+    stats = {TicTacToeEngine.human_marker:MoveStats(), TicTacToeEngine.cpu_marker:MoveStats()}
+    on_move = lambda marker, loc, seconds, nodes: stats[marker].record(seconds, nodes)
+
+    tally = {TicTacToeEngine.human_marker:0, TicTacToeEngine.cpu_marker:0, None:0}
+    t0 = time.perf_counter()
+    for _ in range(games):
+        winner, _ = play(_engine, x_player, o_player, on_move)
+        tally[winner] += 1
+    return {
+        'matchup'    : matchup,
+        'x'          : x_spec,
+        'o'          : o_spec,
+        'batch'      : batch,
+        'games'      : games,
+        'batch_size' : batch_size,
+        'seed'       : seed,
+        'x_wins'     : tally[TicTacToeEngine.human_marker],
+        'o_wins'     : tally[TicTacToeEngine.cpu_marker],
+        'draws'      : tally[None],
+        'x_stats'    : stats[TicTacToeEngine.human_marker].as_dict(),
+        'o_stats'    : stats[TicTacToeEngine.cpu_marker].as_dict(),
+        'seconds'    : time.perf_counter() - t0,
+        'pid'        : os.getpid(),
+    }
+
+########################################################
+# tournament
+########################################################
+def read_records(path : str) -> List:
+    '''
+    records already in a JSON Lines output, a torn last line (run killed mid write) is ignored
+    '''
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path) as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+    return records
+
+def drop_torn_tail(path : str) -> None:
+    '''
+    cut path after its last newline, so appending to it doesn't glue a record to a half written one
+    '''
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+def plan(players : List, games : int, batch_size : int) -> Iterator:
+    '''
+    (x spec, o spec, batch index, # games) of every batch of the round robin
+    '''
+    for x_spec in players:
+        for o_spec in players:
+            if x_spec == o_spec and len(players) > 1:
+                continue
+            for batch in range(math.ceil(games / batch_size)):
+                yield x_spec, o_spec, batch, min(batch_size, games - batch * batch_size)
+
+def batch_key(matchup : str, batch : int, games : int, batch_size : int, seed : int) -> tuple:
+    '''
+    identity of a batch, the same games are played only if all of these match
+    '''
+    return matchup, batch, games, batch_size, seed
+
+def record_key(record : Dict) -> tuple:
+    return batch_key(record['matchup'], record['batch'], record['games'], record.get('batch_size'), record.get('seed'))
+
+def summarize(records : List) -> Dict:
+    '''
+    matchup -> totals, win / draw / loss from the x point of view, move time percentiles and nodes per side
+    '''
+    out : Dict = {}
+    for record in records:
+        s = out.setdefault(record['matchup'], {
+            'x' : record['x'], 'o' : record['o'], 'games' : 0, 'x_wins' : 0, 'o_wins' : 0, 'draws' : 0,
+            'x_stats' : MoveStats(), 'o_stats' : MoveStats(),
+        })
+        for counter in ('games','x_wins','o_wins','draws'):
+            s[counter] += record[counter]
+        s['x_stats'].merge(MoveStats.from_dict(record['x_stats']))
+        s['o_stats'].merge(MoveStats.from_dict(record['o_stats']))
+
+    for s in out.values():
+        for side in ('x','o'):
+            stats = s.pop(f'{side}_stats')
+            s[side + '_moves'] = stats.moves
+            s[side + '_nodes'] = stats.nodes
+            s[side + '_nodes_per_move'] = stats.nodes / stats.moves if stats.moves else 0.0
+            for q in (50,90,99):
+                s[f'{side}_p{q}_us'] = stats.percentile(q) * 1e6
+    return out
+
+def run_tournament(players : List, games : int, output : str, batch_size : int = 1000, workers : int = None, seed : int = 0) -> Dict:
+    '''
+    play every missing batch of the round robin, appending each to output as it finishes
+    returns summarize() of the batches of this plan in output, old and new
+    workers=0 plays in this process
+    '''
+    drop_torn_tail(output)
+    batches = list(plan(players, games, batch_size))
+    keys = [batch_key(f'{x_spec} vs {o_spec}', batch, n, batch_size, seed) for x_spec, o_spec, batch, n in batches]
+    wanted = set(keys)
+    done : Dict = {} # batch key -> record, only batches of the current plan
+    for record in read_records(output):
+        key = record_key(record)
+        if key in wanted:
+            done.setdefault(key, record)
+    todo = [b for b,key in zip(batches, keys) if key not in done]
+    for spec in players:
+        make_player(spec) # fail early on a bad spec
+
+    with open(output, 'a') as out:
+        def write(record : Dict) -> None:
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+            done.setdefault(record_key(record), record)
+
+        if workers == 0:
+            for x_spec, o_spec, batch, n in todo:
+                write(run_batch(x_spec, o_spec, batch, n, seed, batch_size))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=warm_worker) as pool:
+                futures = [pool.submit(run_batch, x_spec, o_spec, batch, n, seed, batch_size) for x_spec, o_spec, batch, n in todo]
+                try:
+                    for future in as_completed(futures):
+                        write(future.result())
+                except KeyboardInterrupt:
+                    for future in futures:
+                        future.cancel()
+                    raise
+    return summarize([done[key] for key in keys if key in done])
+
+########################################################
+# main
+########################################################
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='tic tac toe engine tournament')
+    parser.add_argument('--players', nargs='+', default=['minimax','depth2','random'], help='player specs, see the module docstring')
+    parser.add_argument('--games', type=int, default=10000, help='games per ordered pair of players')
+    parser.add_argument('--batch', type=int, default=1000, help='games per batch, the unit of work and of resume')
+    parser.add_argument('--workers', type=int, default=None, help='processes, default # cpus, 0 to play in this process')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='tournament.jsonl', help='JSON Lines file of finished batches, appended to')
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        summary = run_tournament(args.players, args.games, args.output, args.batch, args.workers, args.seed)
+    except KeyboardInterrupt:
+        print(f'interrupted, rerun to resume from {args.output}', file=sys.stderr)
+        return 130
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+
+    print(f"{'matchup':28} {'games':>9} {'x wins':>8} {'o wins':>8} {'draws':>8}   p50/p99 us x   p50/p99 us o   nodes/move x / o")
+    for matchup, s in summary.items():
+        print(
+            f"{matchup:28} {s['games']:>9} {s['x_wins']:>8} {s['o_wins']:>8} {s['draws']:>8}"
+            f"   {s['x_p50_us']:6.1f}/{s['x_p99_us']:<6.1f} {s['o_p50_us']:6.1f}/{s['o_p99_us']:<6.1f}"
+            f"   {s['x_nodes_per_move']:.1f} / {s['o_nodes_per_move']:.1f}"
+        )
+    print(f'{time.perf_counter() - t0:.1f}s, results in {args.output}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
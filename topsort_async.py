@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+top sort when the dependencies come from an async service
+
+the key set isn't known up front, so the graph is discovered by expanding from some root keys
+every discovered node is queued and resolved by a fixed pool of worker coroutines
+so the service latency overlaps instead of being paid node after node
+once nothing is left to discover, the graph goes through topsort_kahn as usual
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Callable,Iterable
+import asyncio
+
+from topsort_kahn import top_sort
+
+########################################################
+# discovery
+########################################################
+_DONE = object() # queue sentinel telling a worker discovery is over
+
+async def discover(roots : Iterable, resolver : Callable, max_concurrency : int = 16) -> Dict:
+    '''
+    expand the graph reachable from roots
+
+    args:
+        roots
+            iterable of hashable keys to start from
+        resolver
+            async function taking a key and returning a list of dependencies
+        max_concurrency
+            # worker coroutines, i.e. max # resolver calls in flight at any time
+
+    returns:
+        dict key -> dependencies, keys in discovery order (roots first)
+        so the resulting top sort is reproducible whatever order the resolver answers in
+    '''
+    if max_concurrency < 1:
+        raise ValueError(f'max_concurrency must be at least 1, got {max_concurrency}')
+    queue : asyncio.Queue = asyncio.Queue() # discovered keys waiting for a worker
+    order : List = [] # keys in discovery order
+    seen : set = set()
+    resolved : Dict = {}
+    pending = 0 # keys discovered but not resolved yet
+    workers : List = []
+
+    def schedule(key):
+        nonlocal pending
+        if key not in seen:
+            seen.add(key)
+            order.append(key)
+            pending += 1
+            queue.put_nowait(key)
+
+    async def worker():
+        nonlocal pending
+        while True:
+            key = await queue.get()
+            if key is _DONE:
+                return
+            deps = list(await resolver(key))
+            resolved[key] = deps
+            for dep in deps:
+                schedule(dep)
+            pending -= 1
+            if not pending: # last expansion and nothing new found, release every worker
+                for _ in workers:
+                    queue.put_nowait(_DONE)
+
+    for key in roots:
+        schedule(key)
+    if not pending:
+        return {}
+
+    # a fixed pool of workers pulling from the queue, O(1) bookkeeping per key however wide the graph
+    workers.extend(asyncio.ensure_future(worker()) for _ in range(max_concurrency))
+    try:
+        await asyncio.gather(*workers) # re-raises the first resolver error
+    finally:
+        for task in workers:
+            task.cancel()
+
+    return {key:resolved[key] for key in order}
+
+########################################################
+# top sort
+########################################################
+async def top_sort_async(roots : Iterable, resolver : Callable, max_concurrency : int = 16, key : Callable = None) -> List:
+    '''
+    discover the graph reachable from roots with an async resolver, then top sort it a la Kahn
+
+    args:
+        roots, resolver, max_concurrency
+            see discover
+        key
+            optional tie-break priority, see topsort_kahn.top_sort
+
+    returns:
+        list of keys in top sort order, dependencies first
+
+    raises:
+        whatever resolver raises, or CycleError if the discovered graph has a cycle
+    '''
+    graph = await discover(roots, resolver, max_concurrency)
+    return top_sort(graph, graph.__getitem__, key)
+
+if __name__ == '__main__':
+    import time
+
+    def fan_in(n : int) -> Dict:
+        # one root depending on n leaves
+        graph = {i:[] for i in range(1, n+1)}
+        graph[0] = list(graph)
+        return graph
+
+    def fake_resolver(graph : Dict, delay : float) -> Callable:
+        # local stand-in for the service, every call costs one round-trip of `delay` seconds
+        async def resolver(key):
+            await asyncio.sleep(delay)
+            return graph[key]
+        return resolver
+
+    # (a) latency overlaps: root + 99 leaves at 10ms each is 1 + ceil(99/16) = 8 round-trips, not 100
+    graph = fan_in(99)
+    t0 = time.perf_counter()
+    order = asyncio.run(top_sort_async([0], fake_resolver(graph, 0.01)))
+    seconds = time.perf_counter() - t0
+    assert order == list(range(1, 100)) + [0]
+    print(f'100 nodes at 10ms each: {seconds:.3f}s ({seconds / 0.01:.1f} round-trips, 100 if resolved one by one)')
+    assert seconds < 0.25
+
+    # (b) wide graphs stay linear: a do-nothing resolver, time per node should stay flat as n grows
+    per_node = {}
+    for n in [10000, 20000, 40000]:
+        graph = fan_in(n)
+        t0 = time.perf_counter()
+        discovered = asyncio.run(discover([0], fake_resolver(graph, 0)))
+        per_node[n] = (time.perf_counter() - t0) / n
+        assert len(discovered) == n + 1
+        print(f'fan-in N={n:>6}: {per_node[n] * n:.3f}s, {per_node[n] * 1e6:.1f}us per node')
+    assert per_node[40000] < 3 * per_node[10000]
+
+    # resolver errors come out of top_sort_async
+    async def failing(key):
+        raise KeyError(key)
+    try:
+        asyncio.run(top_sort_async(['A'], failing))
+    except KeyError:
+        pass
+    else:
+        raise AssertionError('resolver error swallowed')
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+memoizing / batching adapter for dependencies_fn
+
+when dependencies_fn is expensive (e.g. it hits a metadata store) we want
+    each node resolved exactly once, however many times it gets asked for
+    resolution done in bulk where the backing store supports it
+    call counts, to check the above actually happens
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Callable,Iterable
+
+########################################################
+# CachedDependencies
+########################################################
+class CachedDependencies:
+    '''
+    drop-in replacement for dependencies_fn that resolves each node exactly once
+
+    args:
+        dependencies_fn
+            function taking a node and returning a list of dependencies
+        dependencies_many
+            optional bulk version, taking a list of nodes and returning either
+            a dict node -> dependencies or a list of dependencies aligned with the nodes
+        batch_size
+            max # nodes per dependencies_many call, None for no limit
+
+    the top sorts call prefetch(graph) before resolving anything,
+    so with dependencies_many the whole graph is resolved in len(graph) / batch_size calls
+
+    usage:
+        deps = CachedDependencies(lambda k: store.get(k), lambda ks: store.get_many(ks), batch_size=1000)
+        topsort_kahn.top_sort(graph, deps)
+        deps.stats()
+    '''
+
+    def __init__(self, dependencies_fn : Callable = None, dependencies_many : Callable = None, batch_size : int = None):
+        if dependencies_fn is None and dependencies_many is None:
+            raise ValueError('need dependencies_fn and / or dependencies_many')
+        self.dependencies_fn   = dependencies_fn
+        self.dependencies_many = dependencies_many
+        self.batch_size        = batch_size
+        self.cache : Dict = {} # node -> dependencies
+
+        # counters
+        self.calls       = 0 # dependencies_fn calls
+        self.batch_calls = 0 # dependencies_many calls
+        self.hits        = 0 # lookups answered from cache
+        self.misses      = 0 # lookups that had to be resolved
+
+    def __call__(self, node) -> List:
+        try:
+            deps = self.cache[node]
+            self.hits += 1
+            return deps
+        except KeyError:
+            pass
+
+        self.misses += 1
+        if self.dependencies_fn is not None:
+            self.calls += 1
+            deps = self.cache[node] = self.dependencies_fn(node)
+        else:
+            self._resolve_batch([node])
+            deps = self.cache[node]
+        return deps
+
+    def prefetch(self, nodes : Iterable) -> None:
+        '''
+        resolve every node not cached yet, in batches if dependencies_many is available
+        '''
+        if self.dependencies_many is None:
+            return # nothing to gain, nodes get resolved one by one on first lookup
+
+        todo = [node for node in nodes if node not in self.cache]
+        step = self.batch_size or len(todo) or 1
+        for i in range(0,len(todo),step):
+            self._resolve_batch(todo[i:i+step])
+
+    def _resolve_batch(self, nodes : List) -> None:
+        self.batch_calls += 1
+        resolved = self.dependencies_many(nodes)
+        if isinstance(resolved,dict):
+            for node in nodes:
+                self.cache[node] = resolved[node]
+        else:
+            self.cache.update(zip(nodes,resolved))
+
+    def clear(self) -> None:
+        '''
+        forget cached dependencies (counters are kept)
+        '''
+        self.cache.clear()
+
+    def stats(self) -> Dict:
+        '''
+        counters as a dict, e.g. to log or assert on
+        '''
+        return {
+            'resolved'    : len(self.cache),
+            'calls'       : self.calls,
+            'batch_calls' : self.batch_calls,
+            'hits'        : self.hits,
+            'misses'      : self.misses,
+        }
+
+########################################################
+# helpers used by the top sorts
+########################################################
+def resolve_dependencies(nodes : Iterable, dependencies_fn : Callable) -> Dict:
+    '''
+    node -> dependencies for every node, calling dependencies_fn once per node
+
+    if dependencies_fn can prefetch (e.g. CachedDependencies) it gets the chance to batch first
+    '''
+    prefetch = getattr(dependencies_fn,'prefetch',None)
+    if prefetch is not None:
+        nodes = list(nodes)
+        prefetch(nodes)
+    return {node:dependencies_fn(node) for node in nodes}
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+command line top sort of big graph files
+
+    python topsort_cli.py deps.txt                        # edge list, one `node dep` pair per line
+    python topsort_cli.py deps.jsonl --format jsonl       # one {"node": ..., "deps": [...]} per line
+    python topsort_cli.py deps.adj --format adj --layers  # one `node: dep dep ...` per line, print onion layers
+    cat deps.txt | python topsort_cli.py - --stats        # read stdin, report timings / peak RSS on stderr
+
+input is streamed line by line through a large read buffer, never loaded whole
+output is written as the sort produces it, one node (or one layer) per line
+nodes that only ever appear as dependencies are treated as leaves
+"""
+import time
+STARTED = time.perf_counter() # before the other imports, so --stats can report startup cost
+
+########################################################
+# imports
+########################################################
+from typing import Dict,Iterator
+import argparse
+import json
+import sys
+
+from topsort_kahn import iter_top_sort
+from topsort_onion import iter_layers
+
+try:
+    import resource # unix only, for peak RSS
+except ImportError:
+    resource = None
+
+READ_BUFFER = 1 << 20 # bytes read from disk at a time
+
+########################################################
+# readers
+########################################################
+def _lines(path : str) -> Iterator[str]:
+    '''
+    stripped, non-empty, non-comment lines of path ('-' for stdin), read in READ_BUFFER chunks
+    '''
+    f = sys.stdin.buffer if path == '-' else open(path, 'rb', buffering=READ_BUFFER)
+    try:
+        for raw in f:
+            line = raw.strip()
+            if line and not line.startswith(b'#'):
+                yield line.decode('utf-8')
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+def read_edges(path : str) -> Iterator:
+    '''
+    `node dep` per line (node depends on dep), a lone `node` declares a node without dependencies
+    yields (node, [dep]) pairs
+    '''
+    for line in _lines(path):
+        node, *deps = line.split()
+        yield node, deps
+
+def read_jsonl(path : str) -> Iterator:
+    '''
+    {"node": ..., "deps": [...]} per line, or [node, [deps]]
+    yields (node, deps) pairs
+    '''
+    for line in _lines(path):
+        record = json.loads(line)
+        if isinstance(record, dict):
+            yield record['node'], record.get('deps', [])
+        else:
+            yield record[0], record[1]
+
+def read_adjacency(path : str) -> Iterator:
+    '''
+    `node: dep dep ...` per line
+    yields (node, deps) pairs
+    '''
+    for line in _lines(path):
+        node, _, deps = line.partition(':')
+        yield node.strip(), deps.split()
+
+READERS = {
+    'edges' : read_edges,
+    'jsonl' : read_jsonl,
+    'adj'   : read_adjacency,
+}
+
+def load_graph(path : str, fmt : str = 'edges') -> Dict:
+    '''
+    stream path into a dict node -> list of dependencies
+    repeated nodes accumulate their dependencies, undeclared dependencies become leaves
+    '''
+    graph : Dict = {}
+    for node, deps in READERS[fmt](path):
+        known = graph.get(node)
+        if known is None:
+            graph[node] = list(deps)
+        else:
+            known.extend(deps)
+    for deps in list(graph.values()):
+        for dep in deps:
+            if dep not in graph:
+                graph[dep] = []
+    return graph
+
+########################################################
+# main
+########################################################
+def peak_rss_mb() -> float:
+    '''
+    peak resident set size of this process in MB, nan if unavailable
+    '''
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024 # bytes on macOS, KB on linux
+
+def main(argv = None) -> int:
+    parser = argparse.ArgumentParser(description='top sort a dependency graph file')
+    parser.add_argument('input', help="graph file, '-' for stdin")
+    parser.add_argument('--format', choices=sorted(READERS), default='edges', help='input format (default: edges)')
+    parser.add_argument('--output', default='-', help="where to write the order, '-' for stdout (default)")
+    parser.add_argument('--layers', action='store_true', help='write one onion layer per line instead of one node per line')
+    parser.add_argument('--stats', action='store_true', help='report timings and peak RSS on stderr')
+    args = parser.parse_args(argv)
+
+    t_start = time.perf_counter()
+    graph = load_graph(args.input, args.format)
+    t_loaded = time.perf_counter()
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', buffering=READ_BUFFER)
+    try:
+        if args.layers:
+            for layer in iter_layers(graph, graph.__getitem__):
+                out.write(' '.join(map(str, layer)))
+                out.write('\n')
+        else:
+            for node in iter_top_sort(graph, graph.__getitem__):
+                out.write(f'{node}\n')
+        out.flush()
+    except ValueError as e: # CycleError, nodes written so far are still a valid prefix
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    t_sorted = time.perf_counter()
+
+    if args.stats:
+        edges = sum(map(len, graph.values()))
+        print(
+            f'nodes={len(graph)} edges={edges} '
+            f'startup={t_start - STARTED:.3f}s load={t_loaded - t_start:.3f}s sort+write={t_sorted - t_loaded:.3f}s '
+            f'peak_rss={peak_rss_mb():.1f}MB',
+            file=sys.stderr,
+        )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+compact top sort for big graphs
+
+a dict of lists keyed by arbitrary hashables costs ~100 bytes per edge
+here the graph is compiled once into integer ids and CSR (compressed sparse row) arrays
+    keys     / id -> original key
+    indptr   / dependencies of id i are indices[indptr[i]:indptr[i+1]]
+    indices  / dependency ids, 4 bytes per edge
+and the onion is peeled with numpy on whole frontiers at a time
+keys are only translated back at the very end
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Callable
+from itertools import chain
+import numpy as np
+
+from topsort_cycles import diagnose
+from topsort_cache import resolve_dependencies
+
+########################################################
+# compiled graph
+########################################################
+class CSRGraph:
+    '''
+    integer indexed graph, dependencies stored as CSR arrays
+
+    attributes:
+        keys
+            list, id -> original key
+        index
+            dict, original key -> id
+        indptr, indices
+            dependencies of id i are indices[indptr[i]:indptr[i+1]]
+    '''
+
+    def __init__(self, keys : List, indptr : np.ndarray, indices : np.ndarray, index : Dict = None):
+        self.keys    = keys
+        self.index   = {k:i for i,k in enumerate(keys)} if index is None else index
+        self.indptr  = indptr
+        self.indices = indices
+        self._reverse = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def dependencies(self, i : int) -> np.ndarray:
+        '''
+        dependency ids of id i
+        '''
+        return self.indices[self.indptr[i]:self.indptr[i+1]]
+
+    def in_degree(self) -> np.ndarray:
+        '''
+        # dependencies of each id
+        '''
+        return np.diff(self.indptr)
+
+    def reverse(self):
+        '''
+        dependents index as CSR, i.e. (rev_indptr, rev_indices)
+        dependents of id i are rev_indices[rev_indptr[i]:rev_indptr[i+1]], in id order
+        built once and cached
+        '''
+        if self._reverse is None:
+            n = len(self)
+            src = np.repeat(np.arange(n,dtype=self.indices.dtype), self.in_degree()) # edge -> dependent id
+            order = np.argsort(self.indices, kind='stable') # group edges by dependency id
+            rev_indptr = np.zeros(n+1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=n), out=rev_indptr[1:])
+            self._reverse = (rev_indptr, src[order])
+        return self._reverse
+
+def compile_graph(graph : Dict, dependencies_fn : Callable) -> CSRGraph:
+    '''
+    map keys of graph to dense int ids and store the dependencies as CSR arrays
+
+    args:
+        graph
+            dict whose keys are the nodes of the graph
+        dependencies_fn
+            function taking a key and returning a list of dependencies
+
+    raises:
+        ValueError if some dependencies are not keys of graph
+    '''
+    keys = list(graph)
+    index = {k:i for i,k in enumerate(keys)}
+    n = len(keys)
+    dtype = np.int32 if n < 2**31 else np.int64
+
+    dependencies = list(resolve_dependencies(keys, dependencies_fn).values())
+    indptr = np.zeros(n+1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len,dependencies), dtype=np.int64, count=n), out=indptr[1:])
+    try:
+        indices = np.fromiter(
+            (index[dep] for dep in chain.from_iterable(dependencies)),
+            dtype=dtype,
+            count=int(indptr[-1]),
+        )
+    except KeyError:
+        missing = [k for k,deps in zip(keys,dependencies) if any(dep not in index for dep in deps)]
+        raise diagnose(graph, missing, lambda k: dependencies[index[k]]) from None
+
+    return CSRGraph(keys, indptr, indices, index)
+
+########################################################
+# vectorized onion peeling
+########################################################
+SMALL_FRONTIER = 16 # frontiers up to this size are relaxed in a python loop
+
+def _gather(indptr : np.ndarray, indices : np.ndarray, rows : np.ndarray) -> np.ndarray:
+    '''
+    concatenate indices[indptr[r]:indptr[r+1]] for every r in rows, without a python loop
+    '''
+    starts = indptr[rows]
+    lengths = indptr[rows+1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return indices[:0]
+    offsets = np.cumsum(lengths) - lengths # where each row's slice lands in the output
+    positions = np.arange(total) - np.repeat(offsets - starts, lengths)
+    return indices[positions]
+
+def iter_layer_ids(csr : CSRGraph):
+    '''
+    generator yielding each onion layer as a sorted array of ids
+
+    each layer only costs numpy work proportional to its outgoing edges:
+        gather the dependents of the frontier
+        subtract the # arrows landing on each of them from in_degree
+        the ones that hit 0 are the next frontier
+    for very wide frontiers np.bincount over all ids is cheaper than np.unique, so we switch
+    for tiny frontiers (e.g. long chains) numpy call overhead dominates, so we loop in python
+
+    raises CycleError (or ValueError) once no more layers can be peeled but ids remain
+    '''
+    n = len(csr)
+    rev_indptr, rev_indices = csr.reverse()
+    in_degree = csr.in_degree()
+    frontier = np.flatnonzero(in_degree == 0)
+    peeled = 0
+
+    while len(frontier):
+        yield frontier
+        peeled += len(frontier)
+
+        if len(frontier) <= SMALL_FRONTIER:
+            next_frontier = []
+            for i in frontier.tolist():
+                for j in rev_indices[rev_indptr[i]:rev_indptr[i+1]].tolist():
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0:
+                        next_frontier.append(j)
+            next_frontier.sort()
+            frontier = np.array(next_frontier, dtype=rev_indices.dtype)
+            continue
+
+        dependents = _gather(rev_indptr, rev_indices, frontier)
+        if len(dependents) * 8 > n:
+            counts = np.bincount(dependents, minlength=n)
+            touched = np.flatnonzero(counts)
+            in_degree[touched] -= counts[touched]
+        else:
+            touched, counts = np.unique(dependents, return_counts=True)
+            in_degree[touched] -= counts
+        frontier = touched[in_degree[touched] == 0]
+
+    if peeled != n:
+        keys = csr.keys
+        unsorted = [keys[i] for i in np.flatnonzero(in_degree > 0).tolist()]
+        raise diagnose(csr.index, unsorted, lambda k: [keys[j] for j in csr.dependencies(csr.index[k]).tolist()])
+
+def top_sort_ids(csr : CSRGraph, layers : bool = False):
+    '''
+    top sort a compiled graph, staying in id space
+
+    returns:
+        one int array of ids in top sort order
+        or, if layers, a list of int arrays, one per onion layer
+    '''
+    peeled_layers = list(iter_layer_ids(csr))
+    if layers:
+        return peeled_layers
+    elif peeled_layers:
+        return np.concatenate(peeled_layers)
+    else:
+        return np.zeros(0, dtype=csr.indices.dtype)
+
+########################################################
+# top_sort
+########################################################
+def top_sort(graph : Dict, dependencies_fn : Callable, layers : bool = False):
+    '''
+    same contract as topsort_onion.top_sort, via a compiled CSR graph
+
+    nodes within a layer come out in graph order
+    for repeated sorts of the same graph, compile_graph once and call top_sort_ids instead
+    '''
+    csr = compile_graph(graph, dependencies_fn)
+    keys = csr.keys
+    if layers:
+        return [[keys[i] for i in layer.tolist()] for layer in top_sort_ids(csr, layers=True)]
+    else:
+        return [keys[i] for i in top_sort_ids(csr).tolist()]
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+cycle diagnostics for the top sorts
+
+when Kahn / the onion can't "bite off" every node, the leftovers either sit on a cycle
+or depend (transitively) on something that isn't in the graph at all
+here we find out which, via strongly connected components (Tarjan), without recursion
+so it copes with 1M node graphs without touching the recursion limit
+"""
+
+########################################################
+# imports
+########################################################
+from typing import List,Dict,Callable,Iterable
+
+########################################################
+# exceptions
+########################################################
+class CycleError(ValueError):
+    '''
+    raised when the graph handed to a top sort is not a DAG
+
+    attributes:
+        components
+            list of cyclic strongly connected components (lists of nodes)
+        members
+            set of every node sitting on some cycle
+        cycle
+            one concrete cycle as a path [a, b, ..., a] where each node depends on the next
+    '''
+
+    def __init__(self, components : List, cycle : List):
+        self.components = components
+        self.members    = {node for component in components for node in component}
+        self.cycle      = cycle
+        path = [repr(node) for node in cycle]
+        if len(path) > 10:
+            path = path[:5] + ['...'] + path[-5:] # keep the message readable for huge cycles
+        super().__init__(
+            f'cycle detected: {" -> ".join(path)} '
+            f'({len(self.members)} node(s) in {len(components)} cyclic component(s))'
+        )
+
+########################################################
+# strongly connected components a la Tarjan
+########################################################
+def strongly_connected_components(nodes : Iterable, dependencies_fn : Callable) -> List:
+    '''
+    find the strongly connected components of the graph restricted to `nodes`
+
+    args:
+        nodes
+            iterable of hashable nodes, arrows to anything outside of it are ignored
+        dependencies_fn
+            function taking a node and returning a list of dependencies
+
+    returns:
+        list of components (lists of nodes), dependencies before dependents
+
+    approach:
+        Tarjan's algorithm, O(N+E)
+        https://en.wikipedia.org/wiki/Tarjan%27s_strongly_connected_components_algorithm
+        the recursion is replaced by an explicit stack of (node, iterator over its dependencies)
+    '''
+    nodes = list(nodes) # keep the caller's order so the output is reproducible
+    members = set(nodes)
+    index   = {} # node -> order of discovery
+    lowlink = {} # node -> smallest index reachable from node's subtree
+    on_stack = set()
+    stack = [] # tarjan stack of visited nodes not yet assigned to a component
+    components = []
+    counter = 0
+
+    for root in nodes:
+        if root in index:
+            continue
+
+        # explicit call stack replacing recursion
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        call_stack = [(root,iter(dependencies_fn(root)))]
+
+        while call_stack:
+            node,deps = call_stack[-1]
+
+            # visit the next dependency of node, if any
+            descended = False
+            for dep in deps:
+                if dep not in members:
+                    continue
+                if dep not in index:
+                    # "recurse" into dep
+                    index[dep] = lowlink[dep] = counter
+                    counter += 1
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    call_stack.append((dep,iter(dependencies_fn(dep))))
+                    descended = True
+                    break
+                elif dep in on_stack:
+                    lowlink[node] = min(lowlink[node],index[dep])
+            if descended:
+                continue
+
+            # all dependencies of node handled, "return" from node
+            call_stack.pop()
+            if call_stack:
+                parent = call_stack[-1][0]
+                lowlink[parent] = min(lowlink[parent],lowlink[node])
+
+            # node is the root of a component, pop it off the tarjan stack
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.remove(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                component.reverse() # discovery order, i.e. starting from the component's root
+                components.append(component)
+
+    return components
+
+def is_cyclic_component(component : List, dependencies_fn : Callable) -> bool:
+    '''
+    a component is a cycle if it has more than one node or its single node depends on itself
+    '''
+    return len(component) > 1 or component[0] in dependencies_fn(component[0])
+
+def find_cycle(component : List, dependencies_fn : Callable) -> List:
+    '''
+    find one concrete cycle [a, b, ..., a] inside a cyclic strongly connected component
+
+    every node of a cyclic component has a dependency inside the component
+    so walking from any node, always stepping to such a dependency, must revisit a node, O(size of component)
+    '''
+    members = set(component)
+    path = []
+    position = {} # node -> index in path
+    node = component[0]
+    while node not in position:
+        position[node] = len(path)
+        path.append(node)
+        node = next(dep for dep in dependencies_fn(node) if dep in members)
+    return path[position[node]:] + [node]
+
+########################################################
+# diagnose leftovers of a top sort
+########################################################
+def diagnose(graph : Dict, unsorted : Iterable, dependencies_fn : Callable) -> ValueError:
+    '''
+    explain why `unsorted` nodes of graph could not be top sorted
+
+    returns (doesn't raise) the exception, so callers can `raise diagnose(...)`
+        CycleError if some of them sit on a cycle
+        ValueError naming the missing dependencies otherwise
+    '''
+    unsorted = list(unsorted)
+    components = [
+        component
+        for component in strongly_connected_components(unsorted, dependencies_fn)
+        if is_cyclic_component(component, dependencies_fn)
+    ]
+    if components:
+        return CycleError(components, find_cycle(components[0], dependencies_fn))
+
+    # no cycle, so something depends on a node that isn't in the graph
+    missing = {dep for node in unsorted for dep in dependencies_fn(node) if dep not in graph}
+    return ValueError(f'{len(unsorted)} node(s) depend on nodes missing from the graph: {", ".join(sorted(map(repr,missing)))}')
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+dirty-set invalidation on top of the Kahn order
+
+when we use the top sort as a build plan and a few inputs change,
+only the changed nodes and everything (transitively) depending on them need to be rebuilt
+walking the dependents index from the changed nodes finds those in O(size of the downstream set)
+and, if the previous full order is kept, its positions sort them without another full sort
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Callable,Iterable
+
+from topsort_kahn import dependents_index,top_sort
+
+########################################################
+# downstream of a change
+########################################################
+def downstream(changed : Iterable, dependents : Dict) -> set:
+    '''
+    changed nodes plus every node that (transitively) depends on one of them
+
+    args:
+        changed
+            iterable of nodes
+        dependents
+            dict node -> nodes that depend on it, see topsort_kahn.dependents_index
+    '''
+    dirty = set(changed)
+    stack = list(dirty)
+    while stack:
+        for node in dependents.get(stack.pop(),()):
+            if node not in dirty:
+                dirty.add(node)
+                stack.append(node)
+    return dirty
+
+def invalidate(changed : Iterable, dependencies : Dict, dependents : Dict, position : Dict = None) -> List:
+    '''
+    top sorted list of the nodes to rebuild after `changed` changed
+
+    args:
+        changed
+            iterable of nodes
+        dependencies, dependents
+            dicts as returned by topsort_kahn.dependents_index
+        position
+            optional dict node -> index in a previous full top sort order
+            if given the dirty nodes are simply sorted by it, O(k log k) for k dirty nodes
+            otherwise Kahn runs on the dirty subgraph only, O(k + edges among them)
+    '''
+    dirty = downstream(changed, dependents)
+    if position is not None:
+        return sorted(dirty, key=position.__getitem__)
+
+    # dependencies outside the dirty set are untouched, i.e. already built
+    subgraph = {node:[dep for dep in dependencies[node] if dep in dirty] for node in dirty}
+    return top_sort(subgraph, subgraph.__getitem__)
+
+########################################################
+# BuildPlan
+########################################################
+class BuildPlan:
+    '''
+    full Kahn order of a graph, kept around to answer `what do I rebuild if these change`
+
+    usage:
+        plan = BuildPlan(graph, lambda key: graph[key])
+        plan.order # full build
+        plan.invalidate(['C']) # ['C','D','B','F'], already in build order
+    '''
+
+    def __init__(self, graph : Dict, dependencies_fn : Callable, key : Callable = None):
+        self.dependencies, _, self.dependents = dependents_index(graph, dependencies_fn)
+        self.order : List = top_sort(graph, self.dependencies.__getitem__, key)
+        self.position : Dict = {node:i for i,node in enumerate(self.order)}
+
+    def invalidate(self, changed : Iterable) -> List:
+        '''
+        changed nodes and their transitive dependents, in the cached build order
+
+        raises:
+            KeyError if some changed nodes are not in the graph
+        '''
+        changed = list(changed)
+        unknown = [node for node in changed if node not in self.position]
+        if unknown:
+            raise KeyError(f'not in the build plan: {unknown}')
+        return invalidate(changed, self.dependencies, self.dependents, self.position)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+run the nodes of a DAG on a thread / process pool
+
+the onion layers of topsort_onion are sets of independent nodes, i.e. the natural unit of parallelism
+but waiting for a whole layer to finish before starting the next one (a layer barrier) wastes workers
+so here each node is submitted as soon as all of its own dependencies are done (via topsort_kahn.TopSorter)
+the onion layer of each node is still recorded to help size parallel stages
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Callable
+from dataclasses import dataclass,field
+from concurrent.futures import ThreadPoolExecutor,ProcessPoolExecutor,wait,FIRST_COMPLETED
+import time
+
+from topsort_kahn import TopSorter
+
+########################################################
+# results
+########################################################
+@dataclass
+class NodeResult:
+    '''
+    outcome of running one node
+    '''
+    node     : object
+    status   : str # 'done' or 'failed'
+    value    : object = None # return value of task_fn, if done
+    error    : BaseException = None # exception raised by task_fn, if failed
+    layer    : int = 0 # onion layer, i.e. 0 for leaves, 1 + max layer of dependencies otherwise
+    start    : float = 0.0 # wall clock (time.time()) when task_fn started
+    duration : float = 0.0 # seconds spent in task_fn
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+@dataclass
+class ExecutionResult:
+    '''
+    outcome of running a whole graph
+    '''
+    results : Dict = field(default_factory=dict) # node -> NodeResult, in completion order
+    skipped : List = field(default_factory=list) # nodes never run (failed / cancelled dependency)
+    elapsed : float = 0.0 # wall time of the whole run
+
+    @property
+    def ok(self) -> bool:
+        return not self.skipped and all(r.status == 'done' for r in self.results.values())
+
+    @property
+    def failed(self) -> List:
+        return [node for node,r in self.results.items() if r.status == 'failed']
+
+    @property
+    def values(self) -> Dict:
+        return {node:r.value for node,r in self.results.items() if r.status == 'done'}
+
+########################################################
+# worker side
+########################################################
+def _timed_call(task_fn : Callable, node):
+    '''
+    run task_fn(node) and time it, on the worker
+
+    module-level so it can be pickled for a process pool
+    exceptions are returned rather than raised so the timing survives
+    '''
+    start = time.time()
+    t0 = time.perf_counter()
+    try:
+        value = task_fn(node)
+        ok = True
+    except Exception as e:
+        value = e
+        ok = False
+    return ok, value, start, time.perf_counter() - t0
+
+########################################################
+# run_graph
+########################################################
+def run_graph(
+        graph : Dict,
+        dependency_fn : Callable,
+        task_fn : Callable,
+        max_workers : int = None,
+        use_processes : bool = False,
+        fail_fast : bool = True,
+        key : Callable = None,
+    ) -> ExecutionResult:
+    '''
+    run task_fn(node) for every node of graph, each node only after all its dependencies succeeded
+
+    args:
+        graph
+            dict whose keys are the nodes of the graph
+        dependency_fn
+            function taking a key and returning a list of dependencies
+        task_fn
+            function taking a key, run once per node on the pool
+            must be picklable (e.g. module-level) if use_processes
+        max_workers
+            pool size, None for the concurrent.futures default
+        use_processes
+            run on a ProcessPoolExecutor instead of a ThreadPoolExecutor
+        fail_fast
+            if True, stop submitting and cancel queued nodes on the first failure
+            if False, keep going and only skip nodes that (transitively) depend on a failure
+        key
+            optional priority for nodes ready at the same time, see topsort_kahn.top_sort
+
+    returns:
+        ExecutionResult with a NodeResult (status, value / error, layer, timings) per node that ran
+
+    raises:
+        CycleError if nodes were left unrun because they sit on a cycle
+    '''
+    t0 = time.perf_counter()
+    sorter = TopSorter(graph, dependency_fn, key)
+    out = ExecutionResult()
+    layer = {} # node -> onion layer
+    pending = {} # future -> node
+    stopping = False
+
+    pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_cls(max_workers=max_workers) as pool:
+        while True:
+            # submit everything whose dependencies are done
+            if not stopping:
+                for node in sorter.get_ready():
+                    layer[node] = 1 + max((layer[dep] for dep in sorter.dependencies[node]), default=-1)
+                    try:
+                        pending[pool.submit(_timed_call, task_fn, node)] = node
+                    except Exception as e: # e.g. BrokenProcessPool once a worker died
+                        out.results[node] = NodeResult(node, 'failed', error=e, layer=layer[node])
+
+            # nothing running and nothing ready, i.e. finished, stopped, or blocked by failures / a cycle
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                node = pending.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    ok, value, start, duration = future.result()
+                except Exception as e:
+                    # the pool itself failed the node: worker died (BrokenProcessPool), result not picklable, ...
+                    ok, value, start, duration = False, e, 0.0, 0.0
+                if ok:
+                    out.results[node] = NodeResult(node, 'done', value=value, layer=layer[node], start=start, duration=duration)
+                    sorter.done(node)
+                else:
+                    # don't report failed nodes as done, so their dependents never become ready
+                    out.results[node] = NodeResult(node, 'failed', error=value, layer=layer[node], start=start, duration=duration)
+                    if fail_fast and not stopping:
+                        stopping = True
+                        for other in pending:
+                            other.cancel()
+
+    out.skipped = [node for node in graph if node not in out.results]
+    out.elapsed = time.perf_counter() - t0
+
+    # nodes skipped without any failure to blame must sit on a cycle (or miss a dependency)
+    if out.skipped and not out.failed:
+        sorter.check()
+    return out
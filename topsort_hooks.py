@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+instrumentation for the top sorts, replacing the old DEBUG_LEVEL print tracing
+
+the sorts take an optional `hooks` object and call it on each event
+with hooks=None (the default) every event costs a single `is not None` check
+
+events
+    on_resolve(node, deps)         / dependencies_fn was called for node
+    on_enqueue(node, queued)       / node became ready, queued = # nodes waiting after it was added
+    on_pop(node)                   / node left the ready queue, i.e. it is next in the order
+    on_relax(dep, node, remaining) / the arrow node -> dep was removed, node has `remaining` dependencies left
+    on_layer(layer)                / the onion peeled a layer (onion only)
+    on_phase(name, seconds)        / a phase finished, e.g. 'resolve' or 'sort'
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List
+import sys
+
+########################################################
+# TopSortHooks
+########################################################
+class TopSortHooks:
+    '''
+    no-op base class, override the events you care about
+    '''
+
+    def on_resolve(self, node, deps : List) -> None:
+        pass
+
+    def on_enqueue(self, node, queued : int) -> None:
+        pass
+
+    def on_pop(self, node) -> None:
+        pass
+
+    def on_relax(self, dep, node, remaining : int) -> None:
+        pass
+
+    def on_layer(self, layer : List) -> None:
+        pass
+
+    def on_phase(self, name : str, seconds : float) -> None:
+        pass
+
+########################################################
+# TopSortMetrics
+########################################################
+class TopSortMetrics(TopSortHooks):
+    '''
+    counters and per-phase timings
+
+    attributes:
+        resolved
+            # dependencies_fn calls made by the sort
+        enqueued, popped, relaxed
+            # events of each kind
+        layers
+            # onion layers peeled
+        queue_high_water
+            largest # nodes waiting in the ready queue (or in one onion layer) at once
+        phases
+            dict phase name -> seconds, summed if a phase runs more than once
+    '''
+
+    def __init__(self):
+        self.resolved         = 0
+        self.enqueued         = 0
+        self.popped           = 0
+        self.relaxed          = 0
+        self.layers           = 0
+        self.queue_high_water = 0
+        self.phases : Dict    = {}
+
+    def on_resolve(self, node, deps : List) -> None:
+        self.resolved += 1
+
+    def on_enqueue(self, node, queued : int) -> None:
+        self.enqueued += 1
+        if queued > self.queue_high_water:
+            self.queue_high_water = queued
+
+    def on_pop(self, node) -> None:
+        self.popped += 1
+
+    def on_relax(self, dep, node, remaining : int) -> None:
+        self.relaxed += 1
+
+    def on_layer(self, layer : List) -> None:
+        self.layers += 1
+        if len(layer) > self.queue_high_water:
+            self.queue_high_water = len(layer)
+
+    def on_phase(self, name : str, seconds : float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def as_dict(self) -> Dict:
+        '''
+        counters as a plain dict, e.g. to log or dump as JSON
+        '''
+        return {
+            'resolved'         : self.resolved,
+            'enqueued'         : self.enqueued,
+            'popped'           : self.popped,
+            'relaxed'          : self.relaxed,
+            'layers'           : self.layers,
+            'queue_high_water' : self.queue_high_water,
+            'phases'           : dict(self.phases),
+        }
+
+########################################################
+# PrintHooks
+########################################################
+class PrintHooks(TopSortHooks):
+    '''
+    log every event, the moral equivalent of the old DEBUG_LEVEL = 2
+    '''
+
+    def __init__(self, file = None):
+        self.file = file
+
+    def _print(self, *args) -> None:
+        print(*args, file=self.file or sys.stdout)
+
+    def on_resolve(self, node, deps : List) -> None:
+        self._print('resolve', node, '\t', deps)
+
+    def on_enqueue(self, node, queued : int) -> None:
+        self._print('enqueue', node, '\t', 'queued', queued)
+
+    def on_pop(self, node) -> None:
+        self._print('pop', node)
+
+    def on_relax(self, dep, node, remaining : int) -> None:
+        self._print('[amend in_degree_count] node', node, ':', 'found', dep, '\t', 'remaining', remaining)
+
+    def on_layer(self, layer : List) -> None:
+        self._print('outer_skin', layer)
+
+    def on_phase(self, name : str, seconds : float) -> None:
+        self._print('phase', name, f'{seconds:.6f}s')
@@ -6,38 +6,210 @@ Created on Sat Jun 11 00:45:20 2022
 """
 
 ########################################################
-# complexity
+# imports
 ########################################################
-print('='*30)
-print('memory complexity = O(N)')
-print('='*30)
-print('\t\t we maintain 3 lists (in_degree_count, q and top_sort, could use 2 tbh)')
-print('\t\t each list is at most N (count of nodes) long')
-print()
-
-print('='*30)
-print('runtime complexity = O(N+E)')
-print('='*30)
-print('\t\t the while-loop runs at least N (count of nodes) times')
-print('\t\t within the while-loop we do a for-loop at most E (count of edges) times')
-print()
+from typing import List,Dict,Callable
+from collections import deque # O(1) popleft for the ready queue
+import heapq # priority ready queue when a tie-break key is given
+import time # phase timings for hooks
+
+from topsort_cycles import CycleError,diagnose
+from topsort_cache import resolve_dependencies
+from topsort_hooks import TopSortHooks
 
 ########################################################
-# imports
+# ready queue
 ########################################################
-from typing import List,Dict,Callable
+class ReadyQueue:
+    '''
+    queue of nodes whose dependencies have all been handled
+
+    without a key it is a FIFO backed by a deque, so push / pop are O(1)
+    with a key it is a min-heap on key(node), so push / pop are O(log N)
+    ties on key(node) are broken by insertion order, so nodes never get compared
+    '''
+
+    def __init__(self, key : Callable = None):
+        self.key      = key
+        self.items    = deque() if key is None else []
+        self.inserted = 0 # insertion counter used as heap tie-break
+
+    def push(self, node) -> None:
+        if self.key is None:
+            self.items.append(node)
+        else:
+            heapq.heappush(self.items,(self.key(node),self.inserted,node))
+            self.inserted += 1
+
+    def pop(self):
+        if self.key is None:
+            return self.items.popleft()
+        else:
+            return heapq.heappop(self.items)[-1]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self):
+        # in pop order, only used for logging
+        if self.key is None:
+            return iter(self.items)
+        else:
+            return (item[-1] for item in sorted(self.items))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
 
 ########################################################
-# debugging
+# dependents index
 ########################################################
-DEBUG_LEVEL = 0 # no logs
-#DEBUG_LEVEL = 1 # log at outer while-loop level
-#DEBUG_LEVEL = 2 # log at inner for-loop level
+def dependents_index(graph : Dict, dependencies_fn : Callable, hooks : TopSortHooks = None):
+    '''
+    resolve dependencies exactly once per node and build the reverse index
+    hooks, if given, get on_resolve per node and on_phase('resolve', seconds)
+
+    returns:
+        dependencies    / node -> its dependencies, as returned by dependencies_fn
+        in_degree_count / node -> # dependencies
+        dependents      / node -> nodes that depend on it, appended in graph order
+    '''
+    if hooks is not None: t0 = time.perf_counter()
+    dependencies    : Dict = resolve_dependencies(graph, dependencies_fn)
+    in_degree_count : Dict = {node:len(deps) for node,deps in dependencies.items()}
+    dependents      : Dict = {node:[] for node in graph}
+    for node,deps in dependencies.items():
+        for dep in deps:
+            dependents.setdefault(dep,[]).append(node)
+
+    if hooks is not None:
+        for node,deps in dependencies.items():
+            hooks.on_resolve(node,deps)
+        hooks.on_phase('resolve',time.perf_counter() - t0)
+    return dependencies, in_degree_count, dependents
+
+########################################################
+# incremental top sort a la Kahn's Algorithm
+########################################################
+class TopSorter:
+    '''
+    Kahn's algorithm driven by the caller
+
+    hand out nodes whose dependencies are all done via get_ready()
+    report finished nodes back via done(node), which may make more nodes ready
+    lets a job runner start work on the first ready nodes before the order is fully known
+
+    usage:
+        sorter = TopSorter(graph, dependencies_fn)
+        while sorter.is_active():
+            for node in sorter.get_ready():
+                ... # run node (possibly in the background)
+                sorter.done(node)
+
+    if the graph has a cycle, is_active() goes False with handled < len(graph)
+    and check() raises a CycleError naming the nodes involved
+
+    hooks (see topsort_hooks) get on_resolve / on_enqueue / on_pop / on_relax / on_phase events
+    '''
+
+    def __init__(self, graph : Dict, dependencies_fn : Callable, key : Callable = None, hooks : TopSortHooks = None):
+        self.graph = graph
+        self.hooks = hooks
+        self.dependencies, self.in_degree_count, self.dependents = dependents_index(graph, dependencies_fn, hooks)
+
+        # initialize queue with non-dependent nodes
+        self.q = ReadyQueue(key)
+        for k,v in self.in_degree_count.items():
+            if v == 0:
+                self.q.push(k)
+                if hooks is not None: hooks.on_enqueue(k,len(self.q))
+
+        self.in_flight : set = set() # nodes handed out by get_ready() but not done() yet
+        self.handled   : int = 0 # progression pointer / count of nodes done
+
+    def get_ready(self, n : int = None) -> tuple:
+        '''
+        pop (at most n) nodes from the ready queue and hand them out
+        returns an empty tuple if nothing is ready until more nodes are done()
+        '''
+        count = len(self.q) if n is None else min(n,len(self.q))
+        ready = tuple(self.q.pop() for _ in range(count))
+        self.in_flight.update(ready)
+        if self.hooks is not None:
+            for node in ready:
+                self.hooks.on_pop(node)
+        return ready
+
+    def done(self, *nodes) -> None:
+        '''
+        mark nodes as done, i.e. simulate removing them and their arrows from the graph
+        '''
+        hooks = self.hooks
+        for pushed_node in nodes:
+            if pushed_node not in self.in_flight:
+                raise ValueError(f'node {pushed_node!r} was not handed out by get_ready() or is already done')
+            self.in_flight.remove(pushed_node)
+            self.handled += 1
+
+            # only the dependents of pushed_node are affected so only walk those
+            for node in self.dependents[pushed_node]:
+
+                # augment in_degree_count to simulate removal of this arrow / dependency
+                self.in_degree_count[node] -= 1
+                if hooks is not None: hooks.on_relax(pushed_node,node,self.in_degree_count[node])
+
+                # add newly non-dependent nodes
+                if self.in_degree_count[node] == 0:
+                    self.q.push(node)
+                    if hooks is not None: hooks.on_enqueue(node,len(self.q))
+
+    def is_active(self) -> bool:
+        '''
+        True while there are nodes ready or handed out and not yet done
+        '''
+        return bool(self.q) or bool(self.in_flight)
+
+    def __bool__(self) -> bool:
+        return self.is_active()
+
+    def is_complete(self) -> bool:
+        '''
+        True once every node of the graph is done, False if the graph has a cycle
+        '''
+        return self.handled == len(self.graph)
+
+    def check(self) -> None:
+        '''
+        once nothing is active, raise if some nodes could never be handed out
+            CycleError if they sit on a cycle
+            ValueError if they depend on nodes missing from the graph
+        '''
+        if not self.is_active() and not self.is_complete():
+            unsorted = [node for node,v in self.in_degree_count.items() if v > 0]
+            raise diagnose(self.graph, unsorted, self.dependencies.__getitem__)
+
+def iter_top_sort(graph : Dict, dependencies_fn : Callable, key : Callable = None, hooks : TopSortHooks = None):
+    '''
+    generator version of top_sort, yields each node as soon as its in-degree reaches zero
+
+    a node is considered done once the consumer asks for the next one
+    if the graph has a cycle, raises CycleError once every node that can be sorted has been yielded
+    the 'sort' phase reported to hooks includes whatever time the consumer spends between nodes
+    '''
+    sorter = TopSorter(graph, dependencies_fn, key, hooks)
+    if hooks is not None: t0 = time.perf_counter()
+    while sorter.q:
+        node = sorter.q.pop() # same as get_ready(1) without building a tuple per node
+        sorter.in_flight.add(node)
+        if hooks is not None: hooks.on_pop(node)
+        yield node
+        sorter.done(node)
+    if hooks is not None: hooks.on_phase('sort',time.perf_counter() - t0)
+    sorter.check()
 
 ########################################################
 # top sort a la Kahn's Algorithm
 ########################################################
-def top_sort(graph : Dict, dependencies_fn : Callable):
+def top_sort(graph : Dict, dependencies_fn : Callable, key : Callable = None, hooks : TopSortHooks = None):
     '''
     perform topological sort of some directed acyclic graph
     
@@ -45,9 +217,20 @@ def top_sort(graph : Dict, dependencies_fn : Callable):
         keys
             list of hashable objects representing nodes of the graph dependencies_fn
             function taking a key and returning a list of dependencies
+        key
+            optional function taking a node and returning a sortable priority (e.g. cost or name)
+            when several nodes are ready at once the one with the smallest key goes first
+            when None, ready nodes go first-in first-out
+        hooks
+            optional topsort_hooks.TopSortHooks receiving pop / enqueue / relax / phase events
+            e.g. TopSortMetrics for counters and timings, PrintHooks to trace every step
                 
     returns:
         list of keys in top sort order
+
+    raises:
+        CycleError (a ValueError) carrying the cyclic components and one concrete cycle path
+        ValueError if some nodes depend on nodes missing from the graph
         
     approach:
         Kahn's Algorithm
@@ -55,85 +238,85 @@ def top_sort(graph : Dict, dependencies_fn : Callable):
         
         components
             (a) list  = in_degree_counter / enumerates # dependencies for each node of graph
-            (b) queue = q / list of nodes that are no dependencies
-            (c) list  = top_sort / final topological sorting order found via algo
+            (b) dict  = dependents / reverse index, node -> nodes that depend on it
+            (c) queue = q / ReadyQueue of nodes that are no dependencies
+            (d) list  = top_sort / final topological sorting order found via algo
         idea
             (1) simulate removing non-dependent nodes from graph
             (2) gather non-dependent nodes into `q` whenever they are found
             (3) pop from `q` into results container `top_sort` using non-emptiness of `q` to drive loop
             (4) nodes NOT accounted for in `top_sort` thus must be cyclic as cannot "bite off"
-            
-    '''
+                topsort_cycles.diagnose finds the cycles among them (iterative Tarjan, O(N+E))
 
-    # initialize dependency count tracker
-    in_degree_count : Dict = {node:len(dependencies_fn(node)) for node in graph}
-    
-    # initialize queue with non-dependent nodes
-    q               : List = [k for k,v in in_degree_count.items() if v == 0]
-            
-    # populate top_sort by
-    # (1) popping from q
-    # (2) adjusting in_degree_count to simulated simplifying the graph due to (1)
-    # (3) add newly non-dependent nodes that subsequently appear due to (1)
-    q_handled_index : int  = 0 # progression pointer
-    top_sort        : List = [] # initialize Kahn topological sort output container
-    
-    # keep running until no "loose ends" are found
-    while len(q):
-    
-        if DEBUG_LEVEL > 0: print('='*20)
-        if DEBUG_LEVEL > 0: [print('in_degree_count',node,'\t',dependencies_fn(node)) for node in in_degree_count]
-        if DEBUG_LEVEL > 0: print('q',q)
-
-        # (1) popping from q
-        pushed_node : object = q.pop(0) # grab popped node
-        top_sort.append(pushed_node) # populate top_sort with said node
-        q_handled_index += 1 # increment progression pointer
-        
-        if DEBUG_LEVEL > 0: print('top_sort',top_sort)
+        the loop itself lives in TopSorter / iter_top_sort
             
-        # (2) adjusting in_degree_count to simulated simplifying the graph due to (1)
-        for node in graph:
-            if pushed_node in dependencies_fn(node):
-
-                if DEBUG_LEVEL > 1: print('[amend in_degree_count] node',node,':','found',pushed_node,'in',dependencies_fn(node))
-
-                # augment in_degree_count to simulate removal of this arrow / dependency
-                in_degree_count[node] -= 1
-                
-                # (3) add newly non-dependent nodes that subsequently appear due to (1)
-                if in_degree_count[node] == 0:
-                    q.append(node) # (3)
-                    if DEBUG_LEVEL > 1: print('q',q,'added',node)
-    # at this point len(q) = 0, i.e. algo found no more non-dependent nodes
-
-    # return result
-    if q_handled_index != len(graph):
-        # if there are nodes still NOT been handled by Kahn, they must contain cycle(s)
-        print('cycle detected')
-    else:
-        # otherwise algo traversed all nodes, we're good, i.e. no cycle
-        return top_sort
+    '''
+    top_sort : List = list(iter_top_sort(graph, dependencies_fn, key, hooks))
+    return top_sort
 
 ########################################################
 # example given
 ########################################################
-graph = {
-        'A': [],
-        'B': ['A','D'],
-        'C': [],
-        'D': ['C','E'],
-        'E': [],
-        'F': ['B','G'],
-        'G': ['I'],
-        'H': [],
-        'I': ['H'],
-    }
+if __name__ == '__main__':
+
+    # complexity
+    print('='*30)
+    print('memory complexity = O(N+E)')
+    print('='*30)
+    print('\t\t we maintain 3 lists (in_degree_count, q and top_sort, could use 2 tbh)')
+    print('\t\t each list is at most N (count of nodes) long')
+    print('\t\t plus a dependents index holding each of the E edges once')
+    print()
+
+    print('='*30)
+    print('runtime complexity = O(N+E)')
+    print('='*30)
+    print('\t\t the while-loop runs at least N (count of nodes) times')
+    print('\t\t within the while-loop we do a for-loop over the popped node\'s dependents')
+    print('\t\t summed over all pops that is at most E (count of edges) times')
+    print()
+
+    graph = {
+            'A': [],
+            'B': ['A','D'],
+            'C': [],
+            'D': ['C','E'],
+            'E': [],
+            'F': ['B','G'],
+            'G': ['I'],
+            'H': [],
+            'I': ['H'],
+        }
+
+    assert top_sort(
+        graph,
+        lambda key: graph[key]
+        )==list('ACEHDIBGF')
+
+    # alphabetical tie-break, e.g. once C and E are done D jumps ahead of H
+    assert top_sort(
+        graph,
+        lambda key: graph[key],
+        key = lambda node: node
+        )==list('ACEDBHIGF')
+
+    # cycles are reported with the offending nodes
+    cyclic_graph = {'A': ['B'], 'B': ['C'], 'C': ['A'], 'D': ['A']}
+    try:
+        top_sort(cyclic_graph, lambda key: cyclic_graph[key])
+    except CycleError as e:
+        assert e.members == {'A','B','C'} and e.cycle == ['A','B','C','A']
+    else:
+        raise AssertionError('cycle not detected')
 
-assert top_sort(
-    graph,
-    lambda key: graph[key]
-    )==list('ACEHDIBGF')
+    # streaming, ready batches handed out as soon as their dependencies are done
+    sorter = TopSorter(graph, lambda key: graph[key])
+    batches = []
+    while sorter.is_active():
+        ready = sorter.get_ready()
+        batches.append(ready)
+        sorter.done(*ready)
+    assert batches==[('A','C','E','H'),('D','I'),('B','G'),('F',)]
 
 '''
 # validate
@@ -66,62 +66,107 @@ peel = ['A','C','E','H','D','I','B','G','F']
 '''
 """
 
-########################################################
-# complexity
-########################################################
-print('='*30)
-print('memory complexity = O(N)')
-print('='*30)
-print('\t\t remaining_layers, peeled_layers and outer_skin at all at most the number of nodes')
-print()
-
-print('='*30)
-print('runtime complexity = O(N^2)')
-print('='*30)
-print('\t\t I think the comparison in the for-loop runs at most N * (N+1) / 2 times')
-print()
-
 ########################################################
 # imports
 ########################################################
 from typing import Dict,Callable
+import time # phase timings for hooks
+
+from topsort_cycles import diagnose
+from topsort_kahn import dependents_index
+from topsort_hooks import TopSortHooks
 
 ########################################################
-# graph data
+# iter_layers
 ########################################################
-# given example
-graph = {
-        'A': [],            # 3
-        'B': ['A','D'],     # 1
-        'C': [],            # 4
-        'D': ['C','E'],     # 3
-        'E': [],            # 4
-        'F': ['B','G'],     # 0
-        'G': ['I'],         # 1
-        'H': [],            # 4
-        'I': ['H'],         # 3
-    }
+def iter_layers(graph : Dict, dependency_fn : Callable, hooks : TopSortHooks = None):
+    '''
+    generator yielding each layer of the onion (a list of nodes) as soon as it is peeled
 
-'''
-# example with a cycle
-graph = {
-        'A': ['B'],
-        'B': ['C'],
-        'C': ['A'],
-    }
-'''
+    every node in a layer only depends on nodes in earlier layers
+    so a consumer can start on a layer before the rest of the onion is peeled
+    if the graph has a cycle, raises CycleError once every layer that can be peeled has been yielded
 
-########################################################
-# debugging
-########################################################
-DEBUG_LEVEL = 0 # no logging
-#DEBUG_LEVEL = 1 # log container contents
+    level-synchronous peel:
+        in_degree_count / node -> # dependencies not peeled yet
+        dependents      / node -> nodes that depend on it
+        outer_skin      / frontier, the nodes whose in_degree_count just hit 0
+    peeling outer_skin decrements the in_degree_count of its dependents only
+    whatever hits 0 is the next outer_skin, in the order it was uncovered
+
+    hooks (see topsort_hooks) get on_resolve / on_layer / on_pop / on_relax / on_enqueue / on_phase events
+    the 'peel' phase includes whatever time the consumer spends between layers
+    '''
+    # resolve dependencies exactly once per node and build the dependents index
+    dependencies, in_degree_count, dependents = dependents_index(graph, dependency_fn, hooks)
+
+    ##################################################################
+    # initialize with the outer skin / i.e. leaves
+    ##################################################################
+    outer_skin = [k for k,v in in_degree_count.items() if v == 0]
+    if hooks is not None:
+        t0 = time.perf_counter()
+        for queued,k in enumerate(outer_skin,1):
+            hooks.on_enqueue(k,queued)
+
+    # peel until there's nothing left to peel
+    # if nodes remain at that point they depend on each other cyclicly
+    peeled = 0
+    while outer_skin: # while onion still has a skin
+        if hooks is not None:
+            hooks.on_layer(outer_skin)
+            for k in outer_skin:
+                hooks.on_pop(k)
+        yield outer_skin
+        peeled += len(outer_skin)
+
+        # identify next layer, the nodes whose last unpeeled dependency was in this skin
+        next_skin = []
+        for k in outer_skin:
+            for node in dependents[k]:
+                in_degree_count[node] -= 1
+                if hooks is not None: hooks.on_relax(k,node,in_degree_count[node])
+                if in_degree_count[node] == 0:
+                    next_skin.append(node)
+                    if hooks is not None: hooks.on_enqueue(node,len(next_skin))
+        outer_skin = next_skin
+
+    if hooks is not None: hooks.on_phase('peel',time.perf_counter() - t0)
+
+    # onion wasn't completely peeled away, find out what the remaining nodes sit on
+    if peeled != len(graph):
+        remaining_layers = [k for k,v in in_degree_count.items() if v > 0]
+        raise diagnose(graph, remaining_layers, dependencies.__getitem__)
+
+def iter_top_sort(graph : Dict, dependency_fn : Callable, hooks : TopSortHooks = None):
+    '''
+    generator yielding each node in top sort order, one layer at a time
+    '''
+    for outer_skin in iter_layers(graph, dependency_fn, hooks):
+        yield from outer_skin
 
 ########################################################
 # top_sort
 ########################################################
-def top_sort(graph : Dict, dependency_fn : Callable):
+def top_sort(graph : Dict, dependency_fn : Callable, layers : bool = False, hooks : TopSortHooks = None):
     '''
+    args:
+        graph
+            dict whose keys are the nodes of the graph
+        dependency_fn
+            function taking a key and returning a list of dependencies
+        layers
+            if True return the layers of the onion as a list of lists
+            (nodes within a layer are independent of each other, e.g. one parallel stage each)
+            if False return the layers flattened into one list
+        hooks
+            optional topsort_hooks.TopSortHooks receiving layer / relax / phase events
+            e.g. TopSortMetrics for counters and timings, PrintHooks to trace every step
+
+    raises:
+        CycleError (a ValueError) carrying the cyclic components and one concrete cycle path
+        ValueError if some nodes depend on nodes missing from the graph
+
     idea : 
         liken a DAG to an onion
         the core of the onion -> terminal node
@@ -139,81 +184,63 @@ def top_sort(graph : Dict, dependency_fn : Callable):
     note:
         after implementing Kahn's algorithm I thought I'd try my own version
         turns out my onion idea is just Kahn in disguise
+        the peeling itself lives in iter_layers
     '''
-    remaining_layers = list(graph.keys()) # layers of unpeeled onion
-    peeled_layers = [] # peeled layers of onion
-    
-    if DEBUG_LEVEL > 0: print('init phase')
-    if DEBUG_LEVEL > 0: print('remaining',remaining_layers)
-    if DEBUG_LEVEL > 0: print('peeled',peeled_layers)
-    if DEBUG_LEVEL > 0: print()
-    
-    ##################################################################
-    # initialize `peeled_layers` container with the outer skin / i.e. leaves
-    ##################################################################
-    
-    # temp container for nodes that are on the skin
-    outer_skin = [] 
-    
-    # populate outer_skin / what nodes that have NO dependencies
-    for k in remaining_layers:
-        if len(dependency_fn(k)) == 0:
-            outer_skin.append(k)
-
-    # check cycle at init
-    if len(outer_skin) == 0:
-        print('cycle detected') # remaining nodes depend on each other cyclicly
-        return
-
-    # update containers
-    for k in outer_skin:
-        remaining_layers.remove(k) # don't need to consider these nodes again
-        peeled_layers.append(k) # remember what layers have been peeled
-        
-    # recursively peel until there's nothing left
-    while remaining_layers: # while onion still exists
+    # iter_layers raises CycleError if the onion can't be completely peeled away
+    peeled_layers = list(iter_layers(graph, dependency_fn, hooks))
 
-        if DEBUG_LEVEL > 0: print('while-loop')
-        if DEBUG_LEVEL > 0: print('remaining',remaining_layers)
-        if DEBUG_LEVEL > 0: print('peeled',peeled_layers)
-        if DEBUG_LEVEL > 0: print()
-        
-        # temp container for nodes that are on the skin
-        outer_skin = [] 
-        
-        # identify next layer, this new skin must `touch` only peeled layers (depend on only things in peeled_layers)
-        found_something_to_peel = False
-        for k in remaining_layers:
-            if set(dependency_fn(k)).issubset(set(peeled_layers)):
-                outer_skin.append(k)
-                found_something_to_peel = True
-        
-        # check if cycle found, 
-        # if remaining nodes depend on things other than the peeled stuff
-        # it must mean they depend on themselves, i.e. a cycle
-        if not found_something_to_peel:
-            print('cycle found')
-            break
-            
-        # update containers
-        for k in outer_skin:
-            remaining_layers.remove(k) # don't need to consider these nodes again
-            peeled_layers.append(k) # update peeled_layers with contents of newly found outer_skin
-                
-    if DEBUG_LEVEL > 0: print('final result')
-    if DEBUG_LEVEL > 0: print('remaining',remaining_layers)
-    if DEBUG_LEVEL > 0: print('peeled',peeled_layers)
-    if DEBUG_LEVEL > 0: print()
-    
     # return result
-    if len(peeled_layers) == len(graph):
-        # onion was completely peeled away, i.e. no cycle
+    if layers:
         return peeled_layers
     else:
-        # remaining nodes depend on each other cyclicly
-        print('cycle detected')
+        return [k for layer in peeled_layers for k in layer]
+
+########################################################
+# example given
+########################################################
+if __name__ == '__main__':
+
+    # complexity
+    print('='*30)
+    print('memory complexity = O(N+E)')
+    print('='*30)
+    print('\t\t in_degree_count, peeled_layers and outer_skin are at most the number of nodes')
+    print('\t\t the dependents index holds each of the E edges once')
+    print()
+
+    print('='*30)
+    print('runtime complexity = O(N+E)')
+    print('='*30)
+    print('\t\t each node is peeled exactly once')
+    print('\t\t peeling a layer only walks the outgoing edges (dependents) of that layer')
+    print()
+
+    # graph data
+    # given example
+    graph = {
+            'A': [],            # 3
+            'B': ['A','D'],     # 1
+            'C': [],            # 4
+            'D': ['C','E'],     # 3
+            'E': [],            # 4
+            'F': ['B','G'],     # 0
+            'G': ['I'],         # 1
+            'H': [],            # 4
+            'I': ['H'],         # 3
+        }
+
+    '''
+    # example with a cycle
+    graph = {
+            'A': ['B'],
+            'B': ['C'],
+            'C': ['A'],
+        }
+    '''
 
-# return output
-ordered = top_sort(graph,lambda key:graph[key])
-print(ordered)
+    # return output
+    ordered = top_sort(graph,lambda key:graph[key])
+    print(ordered)
 
+    layered = top_sort(graph,lambda key:graph[key],layers=True)
+    print(layered)
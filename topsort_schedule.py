@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+timing estimates on top of the top sort order
+
+critical path
+    with per-node durations, the earliest a node can start is when its slowest dependency finishes
+    one pass in top sort order gives earliest start / finish, a pass in reverse gives latest start / slack
+    the chain of zero slack nodes is the critical path, i.e. the wall-clock floor of a parallel run
+list scheduling
+    with K workers, simulate handing ready nodes out by priority (longest remaining path by default)
+    the predicted makespan helps choose K and the ordering priority for the layered execution
+"""
+
+########################################################
+# imports
+########################################################
+from typing import Dict,List,Callable
+from dataclasses import dataclass,field
+import heapq
+
+from topsort_kahn import dependents_index,top_sort
+
+########################################################
+# helpers
+########################################################
+def _duration_fn(durations) -> Callable:
+    '''
+    accept durations as a dict node -> duration or as a function of the node
+    '''
+    return durations.__getitem__ if isinstance(durations,dict) else durations
+
+########################################################
+# critical path
+########################################################
+@dataclass
+class CriticalPath:
+    '''
+    earliest / latest times per node and the critical chain
+
+    all dicts are keyed by node, times start at 0
+    '''
+    order           : List # top sort order used
+    earliest_start  : Dict
+    earliest_finish : Dict
+    latest_start    : Dict
+    latest_finish   : Dict
+    slack           : Dict # latest_start - earliest_start, 0 on the critical chain
+    chain           : List # critical chain, dependencies first
+    length          : float # finish time of the whole graph with unlimited workers
+
+def critical_path(graph : Dict, dependencies_fn : Callable, durations) -> CriticalPath:
+    '''
+    compute earliest start / finish, slack and the critical chain of a DAG
+
+    args:
+        graph
+            dict whose keys are the nodes of the graph
+        dependencies_fn
+            function taking a key and returning a list of dependencies
+        durations
+            dict node -> duration, or function taking a node and returning its duration
+
+    approach:
+        forward pass in top sort order
+            earliest_start[n] = max(earliest_finish[d] for d in dependencies of n), 0 if none
+        backward pass in reverse top sort order
+            latest_finish[n] = min(latest_start[d] for d in dependents of n), length if none
+        O(N+E) overall
+    '''
+    duration = _duration_fn(durations)
+    dependencies, _, dependents = dependents_index(graph, dependencies_fn)
+    order = top_sort(graph, dependencies.__getitem__)
+
+    # forward pass, remembering which dependency held each node back
+    earliest_start, earliest_finish, critical_dep = {}, {}, {}
+    for node in order:
+        start, held_by = 0, None
+        for dep in dependencies[node]:
+            if earliest_finish[dep] > start:
+                start, held_by = earliest_finish[dep], dep
+        earliest_start[node] = start
+        earliest_finish[node] = start + duration(node)
+        critical_dep[node] = held_by
+    length = max(earliest_finish.values(), default=0)
+
+    # backward pass
+    latest_start, latest_finish = {}, {}
+    for node in reversed(order):
+        latest_finish[node] = min((latest_start[d] for d in dependents[node]), default=length)
+        latest_start[node] = latest_finish[node] - duration(node)
+    slack = {node:latest_start[node] - earliest_start[node] for node in order}
+
+    # walk back from the last node to finish along the dependencies that held it back
+    chain = []
+    node = max(order, key=earliest_finish.__getitem__) if order else None
+    while node is not None:
+        chain.append(node)
+        node = critical_dep[node]
+    chain.reverse()
+
+    return CriticalPath(order, earliest_start, earliest_finish, latest_start, latest_finish, slack, chain, length)
+
+########################################################
+# list scheduling
+########################################################
+@dataclass
+class Simulation:
+    '''
+    outcome of a simulated run on a fixed number of workers
+    '''
+    workers     : int
+    makespan    : float
+    start       : Dict = field(default_factory=dict) # node -> start time
+    finish      : Dict = field(default_factory=dict) # node -> finish time
+    assigned    : Dict = field(default_factory=dict) # node -> worker index
+    utilization : float = 0.0 # busy time / (workers * makespan)
+
+def bottom_levels(graph : Dict, dependencies_fn : Callable, durations) -> Dict:
+    '''
+    node -> longest path from the start of node to the end of the graph (own duration included)
+    the classic list scheduling priority, nodes heading long chains go first
+    '''
+    duration = _duration_fn(durations)
+    dependencies, _, dependents = dependents_index(graph, dependencies_fn)
+    level = {}
+    for node in reversed(top_sort(graph, dependencies.__getitem__)):
+        level[node] = duration(node) + max((level[d] for d in dependents[node]), default=0)
+    return level
+
+def simulate(graph : Dict, dependencies_fn : Callable, durations, workers : int, key : Callable = None) -> Simulation:
+    '''
+    predict the makespan of running graph on `workers` workers with list scheduling
+
+    args:
+        graph, dependencies_fn, durations
+            see critical_path
+        workers
+            # workers, e.g. the max_workers of topsort_executor.run_graph
+        key
+            priority of ready nodes, smallest first, as for topsort_kahn.top_sort
+            defaults to the longest remaining path (bottom level), largest first
+
+    approach:
+        event driven, whenever a worker is free it takes the highest priority ready node
+        time jumps to the next finishing node, which may make more nodes ready
+    '''
+    if workers < 1:
+        raise ValueError('need at least 1 worker')
+    duration = _duration_fn(durations)
+    dependencies, in_degree_count, dependents = dependents_index(graph, dependencies_fn)
+    if key is None:
+        level = bottom_levels(graph, dependencies.__getitem__, duration)
+        key = lambda node: -level[node]
+
+    ready, counter = [], 0 # heap of (key, insertion counter, node)
+    for node,v in in_degree_count.items():
+        if v == 0:
+            heapq.heappush(ready,(key(node),counter,node))
+            counter += 1
+
+    out = Simulation(workers, 0.0)
+    running = [] # heap of (finish time, insertion counter, node, worker)
+    free_workers = list(range(workers))
+    now, busy = 0.0, 0.0
+    while ready or running:
+        # hand ready nodes to free workers
+        while ready and free_workers:
+            node = heapq.heappop(ready)[-1]
+            worker = free_workers.pop()
+            out.start[node], out.assigned[node] = now, worker
+            heapq.heappush(running,(now + duration(node),counter,node,worker))
+            counter += 1
+
+        # jump to the next finish
+        now, _, node, worker = heapq.heappop(running)
+        out.finish[node] = now
+        busy += now - out.start[node]
+        free_workers.append(worker)
+        for dependent in dependents[node]:
+            in_degree_count[dependent] -= 1
+            if in_degree_count[dependent] == 0:
+                heapq.heappush(ready,(key(dependent),counter,dependent))
+                counter += 1
+
+    if len(out.finish) != len(graph):
+        top_sort(graph, dependencies.__getitem__) # raises CycleError naming the cycle
+
+    out.makespan = now
+    out.utilization = busy / (workers * now) if now else 0.0
+    return out